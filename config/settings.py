@@ -65,6 +65,7 @@ EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend' if not DEBUG else
 EMAIL_HOST = env('EMAIL_HOST')
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+EMAIL_TIMEOUT = env('EMAIL_TIMEOUT', default=30, cast=int)
 if not DEBUG:
     EMAIL_HOST_USER = env('EMAIL_USER')
     EMAIL_HOST_PASSWORD = env('EMAIL_PASSWORD')
@@ -93,6 +94,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
     'allauth',
     'allauth.account',
     'allauth.socialaccount',
@@ -173,6 +175,38 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared Redis when CACHE_URL is set (redis://redis:6379/0), otherwise a per-process LocMem for local runs and tests
+# Keys are namespaced by CACHE_KEY_PREFIX, bumping CACHE_VERSION orphans every cached value at once
+# Without CACHE_URL each worker caches in its own memory, so thread pages skip 304s and the anonymous category list is not cached
+
+CACHE_URL = env('CACHE_URL', default='')
+CACHE_KEY_PREFIX = env('CACHE_KEY_PREFIX', default='forum')
+CACHE_VERSION = env('CACHE_VERSION', default=1, cast=int)
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'VERSION': CACHE_VERSION,
+            'OPTIONS': {
+                'socket_connect_timeout': 1,
+                'socket_timeout': 1
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'VERSION': CACHE_VERSION
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -211,3 +245,61 @@ STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+
+# Markdown render cache
+
+RENDER_CACHE_MAX_BYTES = env('RENDER_CACHE_MAX_BYTES', default=8 * 1024 * 1024, cast=int)
+RENDER_CACHE_ALIAS = env('RENDER_CACHE_ALIAS', default=None)
+
+
+# Thread search (defaults to pg_trgm on PostgreSQL and the trigram table elsewhere)
+
+THREADS_SEARCH_BACKEND = env('THREADS_SEARCH_BACKEND', default=None)
+
+
+# Replies folded into a thread's search vector, newest first and clipped to a character budget
+
+THREADS_SEARCH_REPLY_LIMIT = env('THREADS_SEARCH_REPLY_LIMIT', default=200, cast=int)
+THREADS_SEARCH_REPLY_CHARS = env('THREADS_SEARCH_REPLY_CHARS', default=200000, cast=int)
+
+
+# In-memory typeahead index (built per worker, kept fresh by signals and a delta sync)
+
+THREADS_TYPEAHEAD_INDEX = env('THREADS_TYPEAHEAD_INDEX', default=False, cast=bool)
+THREADS_TYPEAHEAD_SYNC_INTERVAL = env('THREADS_TYPEAHEAD_SYNC_INTERVAL', default=30, cast=int)
+
+
+# Post-commit task pool (mail and mention side effects, eager runs them in the request thread)
+
+THREADS_TASK_WORKERS = env('THREADS_TASK_WORKERS', default=4, cast=int)
+THREADS_TASK_QUEUE_SIZE = env('THREADS_TASK_QUEUE_SIZE', default=100, cast=int)
+THREADS_TASK_SUBMIT_TIMEOUT = env('THREADS_TASK_SUBMIT_TIMEOUT', default=0.5, cast=float)
+THREADS_TASK_EAGER = env('THREADS_TASK_EAGER', default=False, cast=bool)
+
+
+# Notification digests (minutes a frequent digest waits to coalesce replies and mentions)
+
+THREADS_DIGEST_WINDOW = env('THREADS_DIGEST_WINDOW', default=5, cast=int)
+
+
+# Mention resolution (seconds a username -> user lookup stays cached)
+
+THREADS_MENTION_CACHE_TTL = env('THREADS_MENTION_CACHE_TTL', default=300, cast=int)
+
+
+# Per-category tag cloud (seconds, signals drop it earlier when tagging changes)
+
+THREADS_TAG_CLOUD_TIMEOUT = env('THREADS_TAG_CLOUD_TIMEOUT', default=3600, cast=int)
+
+
+# Fragment cache for thread cards and replies (bump the version when those templates change)
+
+THREADS_FRAGMENT_CACHE_ALIAS = env('THREADS_FRAGMENT_CACHE_ALIAS', default='default')
+THREADS_FRAGMENT_TIMEOUT = env('THREADS_FRAGMENT_TIMEOUT', default=24 * 3600, cast=int)
+THREADS_FRAGMENT_VERSION = env('THREADS_FRAGMENT_VERSION', default='1')
+
+
+# Shared page cache for anonymous visitors of the category list (seconds, signals drop it on category changes)
+
+THREADS_PAGE_CACHE_TIMEOUT = env('THREADS_PAGE_CACHE_TIMEOUT', default=3600, cast=int)
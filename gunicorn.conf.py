@@ -0,0 +1,10 @@
+def post_worker_init(worker):
+    from django.conf import settings
+    if settings.THREADS_TYPEAHEAD_INDEX:
+        from threads.search import trigram_index
+        trigram_index.warm()
+
+
+def worker_exit(server, worker):
+    from threads.tasks import executor
+    executor.shutdown()
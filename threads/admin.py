@@ -1,5 +1,7 @@
 from django.contrib import admin
-from threads.models import Category, Tag, Thread, Reply, Report
+from django.utils import timezone
+from threads.models import Category, Tag, Thread, Reply, Report, Mention, Notification, OutboundMail
+from threads.search import get_search_backend
 
 # Register your models here.
 
@@ -31,16 +33,33 @@ class ThreadAdmin(admin.ModelAdmin):
     list_editable = ('is_locked', 'is_deleted')
     search_fields = ('title', 'author__username', 'raw_content')
     inlines = [ReplyInline]
-    actions = ['soft_delete_threads', 'lock_threads']
+    actions = ['soft_delete_threads', 'soft_delete_by_authors', 'lock_threads', 'unlock_threads']
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term:
+            results = get_search_backend().admin_search(queryset, search_term)
+            if results is not None:
+                return results, False
+        return super().get_search_results(request, queryset, search_term)
     
     @admin.action(description='Soft delete selected Threads')
     def soft_delete_threads(self, request, queryset) -> None:
-        for thread in queryset:
-            thread.soft_delete()
+        queryset.soft_delete()
+
+    @admin.action(description='Soft delete everything by the authors of selected Threads')
+    def soft_delete_by_authors(self, request, queryset) -> None:
+        authors = queryset.values('author')
+        threads = Thread.objects.filter(author__in=authors).soft_delete()
+        replies = Reply.objects.filter(author__in=authors).soft_delete()
+        self.message_user(request, f'Soft deleted {threads} threads and {replies} replies')
     
     @admin.action(description='Lock selected Threads')
     def lock_threads(self, request, queryset) -> None:
-        queryset.update(is_locked=True)
+        queryset.lock()
+
+    @admin.action(description='Unlock selected Threads')
+    def unlock_threads(self, request, queryset) -> None:
+        queryset.unlock()
 
 
 @admin.register(Report)
@@ -51,3 +70,35 @@ class ReportAdmin(admin.ModelAdmin):
     list_filter = ('status', )
     list_editable = ('status', )
     search_fields = ('reporter__username', 'reason')
+
+
+@admin.register(Mention)
+class MentionAdmin(admin.ModelAdmin):
+    list_select_related = ('user', 'thread')
+    list_display = ('user', 'thread', 'reply', 'created_at')
+    readonly_fields = ('user', 'thread', 'reply', 'created_at')
+    search_fields = ('user__username', )
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_select_related = ('recipient', 'actor', 'thread')
+    list_display = ('recipient', 'kind', 'actor', 'thread', 'created_at', 'digested_at')
+    readonly_fields = ('recipient', 'actor', 'kind', 'thread', 'reply', 'created_at')
+    list_filter = ('kind', )
+    search_fields = ('recipient__username', )
+
+
+@admin.register(OutboundMail)
+class OutboundMailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    readonly_fields = ('dedupe_key', 'recipient', 'from_email', 'subject', 'body', 'attempts', 'last_error', 'created_at', 'sent_at')
+    list_filter = ('status', )
+    search_fields = ('recipient', 'subject')
+    actions = ('retry_mail', )
+
+    @admin.action(description='Retry selected Outbound Mail')
+    def retry_mail(self, request, queryset) -> None:
+        queryset.exclude(status=OutboundMail.StatusChoices.SENT).update(
+            status=OutboundMail.StatusChoices.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
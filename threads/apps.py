@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ThreadsConfig(AppConfig):
     name = 'threads'
+
+    def ready(self) -> None:
+        from threads import handlers, signals # noqa: F401
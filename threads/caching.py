@@ -0,0 +1,41 @@
+import time
+from typing import Any, Callable
+from django.core.cache import cache
+from threads import tasks
+
+LOCK_KEY = '{}:lock'
+
+
+def get_or_compute(key: str, compute: Callable[[], Any], timeout: int, stale: int | None = None, lock_timeout: int = 30, wait: float = 2.0) -> Any:
+    """
+    Cached value of `key` where only one caller at a time runs `compute`.
+
+    Entries outlive `timeout` by `stale` seconds (default `timeout`), in that window readers get the old
+    value while the lock holder refreshes it on the task pool. On a cold key the others poll for up to
+    `wait` seconds before computing it themselves.
+    """
+    stale = timeout if stale is None else stale
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until < time.time() and cache.add(LOCK_KEY.format(key), 1, lock_timeout):
+            tasks.run(_refresh, key, compute, timeout, stale)
+        return value
+    if cache.add(LOCK_KEY.format(key), 1, lock_timeout):
+        return _refresh(key, compute, timeout, stale)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
+
+
+def _refresh(key: str, compute: Callable[[], Any], timeout: int, stale: int) -> Any:
+    try:
+        value = compute()
+        cache.set(key, (value, time.time() + timeout), timeout + stale)
+        return value
+    finally:
+        cache.delete(LOCK_KEY.format(key))
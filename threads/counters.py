@@ -0,0 +1,85 @@
+from collections import Counter, defaultdict
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from threads import stamps
+
+
+def add(model, pk: int, field: str, delta: int) -> None:
+    """Appends a delta in the caller's transaction, `flush` folds it into the column later"""
+    CounterDelta = apps.get_model('threads', 'CounterDelta')
+    CounterDelta.objects.create(target=model._meta.model_name, object_id=pk, field=field, delta=delta)
+
+
+def add_many(model, field: str, deltas: dict[int, int]) -> None:
+    CounterDelta = apps.get_model('threads', 'CounterDelta')
+    CounterDelta.objects.bulk_create([
+        CounterDelta(target=model._meta.model_name, object_id=pk, field=field, delta=delta)
+        for pk, delta in deltas.items()
+        if delta
+    ])
+
+
+def pending(model, field: str):
+    CounterDelta = apps.get_model('threads', 'CounterDelta')
+    total = (
+        CounterDelta.objects
+        .filter(target=model._meta.model_name, object_id=models.OuterRef('pk'), field=field)
+        .values('object_id')
+        .annotate(total=models.Sum('delta'))
+        .values('total')
+    )
+    return Coalesce(models.Subquery(total), 0)
+
+
+def flush(batch_size: int = 1000) -> int:
+    """Folds up to `batch_size` deltas into their columns, one UPDATE per model, returns the deltas applied"""
+    CounterDelta = apps.get_model('threads', 'CounterDelta')
+    with transaction.atomic():
+        rows = list(
+            CounterDelta.objects.select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values_list('pk', 'target', 'object_id', 'field', 'delta')[:batch_size]
+        )
+        if not rows:
+            return 0
+        totals: dict[str, dict[int, Counter]] = defaultdict(lambda: defaultdict(Counter))
+        for _, target, object_id, field, delta in rows:
+            totals[target][object_id][field] += delta
+        for target, objects in totals.items():
+            _apply(apps.get_model('threads', target), objects)
+        CounterDelta.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        # Detail pages already count pending deltas, only the list cards change here
+        if 'thread' in totals:
+            stamps.touch(categories=set(
+                apps.get_model('threads', 'Thread').objects.filter(pk__in=totals['thread']).values_list('category_id', flat=True)
+            ))
+    return len(rows)
+
+
+def _apply(model, objects: dict[int, Counter]) -> None:
+    fields = model.COUNTER_FIELDS
+    # auto_now columns move as they would on save(), refresh_hot_scores reads them as its high-water mark
+    touched = {field.name: timezone.now() for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)}
+    if connection.vendor != 'postgresql':
+        for pk, deltas in objects.items():
+            model.objects.filter(pk=pk).update(**touched, **{
+                field: Greatest(models.F(field) + deltas[field], 0) for field in fields if deltas[field]
+            })
+        return
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(field).column for field in fields]
+    assignments = ', '.join(
+        [f'{quote(column)} = GREATEST(t.{quote(column)} + v.{quote(column)}, 0)' for column in columns]
+        + [f'{quote(model._meta.get_field(name).column)} = %s' for name in touched]
+    )
+    row = '(' + ', '.join(['%s::bigint'] + ['%s::integer'] * len(fields)) + ')'
+    params = list(touched.values()) + [value for pk, deltas in objects.items() for value in (pk, *(deltas[field] for field in fields))]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote(model._meta.db_table)} AS t SET {assignments} '
+            f'FROM (VALUES {", ".join([row] * len(objects))}) AS v(id, {", ".join(quote(column) for column in columns)}) '
+            f'WHERE t.{quote(model._meta.pk.column)} = v.id',
+            params
+        )
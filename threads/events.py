@@ -0,0 +1,138 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+from django.db import connection, transaction
+from threads import tasks
+
+
+@dataclass(frozen=True)
+class Event:
+    pass
+
+
+@dataclass(frozen=True)
+class ThreadCreated(Event):
+    thread_id: int
+    author_id: int
+
+
+@dataclass(frozen=True)
+class ThreadEdited(Event):
+    thread_id: int
+
+
+@dataclass(frozen=True)
+class ThreadDeleted(Event):
+    thread_id: int
+
+
+@dataclass(frozen=True)
+class ReplyCreated(Event):
+    reply_id: int
+    thread_id: int
+    author_id: int
+
+
+@dataclass(frozen=True)
+class ReplyEdited(Event):
+    reply_id: int
+    thread_id: int
+
+
+@dataclass(frozen=True)
+class MentionAdded(Event):
+    thread_id: int
+    reply_id: int | None
+    author_id: int
+    usernames: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class MentionRemoved(Event):
+    thread_id: int
+    reply_id: int | None
+    usernames: tuple[str, ...]
+
+
+_handlers: dict[type[Event], list[Callable[[list], None]]] = defaultdict(list)
+_local = threading.local()
+
+
+def handles(*event_types: type[Event]):
+    """Registers a handler that receives every committed batch of the given event types as a list"""
+    def register(handler):
+        for event_type in event_types:
+            _handlers[event_type].append(handler)
+        return handler
+    return register
+
+
+class _Batch:
+
+    def __init__(self) -> None:
+        self.events: list[Event] = []
+
+    def flush(self) -> None:
+        batches = getattr(_local, 'batches', {})
+        for key, batch in list(batches.items()):
+            if batch is self:
+                del batches[key]
+        dispatch(self.events)
+
+
+def publish(event: Event) -> None:
+    """Queues `event` until the surrounding transaction (or savepoint) commits, dropping it on rollback"""
+    if not connection.in_atomic_block:
+        dispatch([event])
+        return
+    # One batch per savepoint stack, on_commit discards the batch with its savepoint on rollback
+    batches = getattr(_local, 'batches', None)
+    if batches is None:
+        batches = _local.batches = {}
+    key = tuple(connection.savepoint_ids)
+    batch = batches.get(key)
+    if batch is None or not any(func == batch.flush for _, func, _ in connection.run_on_commit):
+        batch = batches[key] = _Batch()
+        transaction.on_commit(batch.flush)
+    batch.events.append(event)
+
+
+def dispatch(events: list[Event]) -> None:
+    grouped: dict[Callable, list[Event]] = defaultdict(list)
+    for event in events:
+        for handler in _handlers[type(event)]:
+            grouped[handler].append(event)
+    suppressed = getattr(_local, 'suppressed', ())
+    for handler, batch in grouped.items():
+        if handler in suppressed:
+            continue
+        for observer in getattr(_local, 'observers', ()):
+            observer.append((handler, batch))
+        tasks.run(handler, batch)
+
+
+@contextmanager
+def capture():
+    """Records every (handler, events) pair dispatched by this thread, e.g. to assert exactly once delivery"""
+    calls: list[tuple[Callable, list[Event]]] = []
+    observers = getattr(_local, 'observers', None)
+    if observers is None:
+        observers = _local.observers = []
+    observers.append(calls)
+    try:
+        yield calls
+    finally:
+        observers.remove(calls)
+
+
+@contextmanager
+def suppress(*handlers: Callable):
+    """Drops the batches `handlers` would receive from this thread, e.g. notifications for seeded data"""
+    previous = getattr(_local, 'suppressed', frozenset())
+    _local.suppressed = previous | set(handlers)
+    try:
+        yield
+    finally:
+        _local.suppressed = previous
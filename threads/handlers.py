@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import Coalesce, Greatest
+from threads.events import handles, ThreadCreated, ThreadEdited, ThreadDeleted, ReplyCreated, ReplyEdited, MentionAdded, MentionRemoved
+from threads.mentions import resolve_usernames
+from threads import stamps
+from threads.models import Tag, Thread, Reply, Mention, Notification
+from threads.search import get_search_backend, trigram_index
+
+
+@handles(ThreadCreated, ThreadEdited)
+def index_threads(events: list) -> None:
+    backend = get_search_backend()
+    for thread in Thread.objects.filter(pk__in={event.thread_id for event in events}):
+        backend.index(thread)
+
+
+@handles(ThreadDeleted)
+def unindex_threads(events: list) -> None:
+    if settings.THREADS_TYPEAHEAD_INDEX and trigram_index.ready:
+        for event in events:
+            trigram_index.remove(event.thread_id)
+
+
+@handles(ThreadDeleted)
+def invalidate_tag_clouds(events: list) -> None:
+    Tag.invalidate_cloud(Thread.objects.filter(pk__in={event.thread_id for event in events}).values_list('category_id', flat=True))
+
+
+@handles(ReplyCreated, ReplyEdited)
+def index_replies(events: list) -> None:
+    backend = get_search_backend()
+    for thread_id in sorted({event.thread_id for event in events}):
+        backend.index_replies(thread_id)
+
+
+@handles(ReplyCreated)
+def move_last_activity(events: list) -> None:
+    # Off the reply insert so busy threads do not serialize on their row, GREATEST keeps late batches from moving it back
+    thread_ids = {event.thread_id for event in events}
+    latest = (
+        Reply.objects
+        .filter(pk__in=[event.reply_id for event in events], thread=models.OuterRef('pk'), is_deleted=False)
+        .values('thread')
+        .annotate(latest=models.Max('created_at'))
+        .values('latest')
+    )
+    Thread.objects.filter(pk__in=thread_ids).update(
+        last_activity_at=Greatest('last_activity_at', Coalesce(models.Subquery(latest), 'last_activity_at'))
+    )
+    stamps.touch_threads(thread_ids)
+
+
+@handles(ReplyCreated)
+def notify_thread_authors(events: list) -> None:
+    owners = dict(
+        Thread.objects.filter(pk__in={event.thread_id for event in events})
+        .exclude(author__digest_frequency='NEVER')
+        .values_list('pk', 'author_id')
+    )
+    Notification.objects.bulk_create([
+        Notification(recipient_id=owners[event.thread_id], actor_id=event.author_id, kind=Notification.KindChoices.REPLY, thread_id=event.thread_id, reply_id=event.reply_id)
+        for event in events
+        if event.thread_id in owners and owners[event.thread_id] != event.author_id
+    ])
+
+
+@handles(MentionAdded, MentionRemoved)
+def sync_mentions(events: list) -> None:
+    users = resolve_usernames({username for event in events for username in event.usernames})
+    mentions, notifications = [], []
+    for event in events:
+        lookup = {'thread_id': event.thread_id, 'reply_id': event.reply_id}
+        if isinstance(event, MentionRemoved):
+            Mention.objects.filter(user_id__in=[users[name][0] for name in event.usernames if name in users], **lookup).delete()
+            continue
+        for user_id, _, wants_digest in (users[name] for name in event.usernames if name in users):
+            if user_id == event.author_id:
+                continue
+            mentions.append(Mention(user_id=user_id, **lookup))
+            if wants_digest:
+                notifications.append(Notification(recipient_id=user_id, actor_id=event.author_id, kind=Notification.KindChoices.MENTION, **lookup))
+    Mention.objects.bulk_create(mentions, ignore_conflicts=True)
+    Notification.objects.bulk_create(notifications)
@@ -0,0 +1,41 @@
+"""
+Backfill Thread Last Activity
+=============================
+Sets `last_activity_at` on every Thread to its newest live reply, or to its
+own creation time when it has none. Threads are updated in pk ranges, one
+short transaction each, so the table is never locked as a whole.
+
+Usage:
+    python manage.py backfill_last_activity
+    python manage.py backfill_last_activity --batch-size 5000
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from threads import stamps
+from threads.models import Category, Thread
+
+
+class Command(BaseCommand):
+    help = 'Recomputes last_activity_at for existing Threads in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of threads updated per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = Thread.objects.aggregate(last=Max('pk'))['last'] or 0
+        start = 0
+        updated = 0
+        while start < last_pk:
+            updated += Thread.objects.filter(pk__gt=start, pk__lte=start + batch_size).refresh_last_activity()
+            start += batch_size
+            self.stdout.write(f'  threads: {updated} updated (up to pk {min(start, last_pk)})')
+        # Orderings changed under every cached list page
+        stamps.touch(categories=Category.objects.values_list('pk', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'✓ threads: {updated} updated'))
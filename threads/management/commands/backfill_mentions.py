@@ -0,0 +1,55 @@
+"""
+Backfill the Mention Table
+==========================
+Parses every Thread and Reply once and records who they mention, so posts
+written before the `Mention` table existed can be queried the same way.
+Existing rows are kept and no notifications are sent.
+
+Usage:
+    python manage.py backfill_mentions
+    python manage.py backfill_mentions --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from threads.mentions import parse_mentions, resolve_usernames
+from threads.models import Thread, Reply, Mention
+
+
+class Command(BaseCommand):
+    help = 'Records mentions for existing Threads and Replies in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts parsed per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Thread, Reply):
+            created = self.backfill(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {model._meta.verbose_name_plural}: {created} mentions recorded'))
+
+    def backfill(self, model, batch_size):
+        fields = ['pk', 'author_id', 'raw_content'] + (['thread_id'] if model is Reply else [])
+        last_pk = 0
+        created = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list(*fields)[:batch_size])
+            if not batch:
+                return created
+            last_pk = batch[-1][0]
+            parsed = [(row, parse_mentions(row[2])) for row in batch]
+            users = resolve_usernames(set().union(*(usernames for _, usernames in parsed)))
+            mentions = []
+            for row, usernames in parsed:
+                lookup = {'thread_id': row[0], 'reply_id': None} if model is Thread else {'thread_id': row[3], 'reply_id': row[0]}
+                mentions += [
+                    Mention(user_id=users[name][0], **lookup)
+                    for name in usernames
+                    if name in users and users[name][0] != row[1]
+                ]
+            Mention.objects.bulk_create(mentions, ignore_conflicts=True)
+            created += len(mentions)
+            self.stdout.write(f'  {model._meta.verbose_name_plural}: {created} mentions recorded (up to pk {last_pk})')
@@ -0,0 +1,123 @@
+"""
+Hot Ordering Benchmark
+======================
+Seeds a throwaway category with synthetic threads of random age and counters,
+then times the first page of the hot ordering three ways: the indexed
+`hot_score` column, the same column with its index dropped, and the score
+computed per request. Also times a full and an incremental
+`refresh_hot_scores` run. Needs PostgreSQL, everything runs in one
+transaction that is rolled back, and the table stays locked while the index
+is dropped, so point it at a development database.
+
+Usage:
+    python manage.py bench_hot
+    python manage.py bench_hot --threads 1000000 --requests 200 --touched 0.01
+"""
+
+import random
+import time
+import uuid
+from statistics import median, quantiles
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from threads import ranking
+from threads.models import Category, Thread
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks hot list pages with and without the precomputed, indexed score'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=100000, help='Synthetic threads seeded (default: 100000)')
+        parser.add_argument('--requests', type=int, default=100, help='Timed page queries per strategy (default: 100)')
+        parser.add_argument('--page-size', type=int, default=10, help='Threads per page (default: 10)')
+        parser.add_argument('--touched', type=float, default=0.01, help='Share of threads touched before the incremental refresh (default: 0.01)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('bench_hot needs PostgreSQL to drop the index inside a transaction')
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('\n✓ Benchmark complete, synthetic threads rolled back'))
+
+    def run(self, options):
+        run = uuid.uuid4().hex[:8]
+        rng = random.Random(options['seed'])
+        author = User.objects.create(username=f'bench-{run}')
+        category = Category.objects.create(name=f'bench-{run}')
+        count = options['threads']
+
+        start = time.perf_counter()
+        for offset in range(0, count, 5000):
+            Thread.objects.bulk_create([
+                Thread(
+                    title=f'Bench {run} #{i}',
+                    raw_content='bench',
+                    author=author,
+                    category=category,
+                    upvote_count=int(rng.paretovariate(1.5)) - 1,
+                    reply_count=int(rng.paretovariate(1.5)) - 1
+                )
+                for i in range(offset, min(offset + 5000, count))
+            ])
+        table = connection.ops.quote_name(Thread._meta.db_table)
+        with connection.cursor() as cursor:
+            # Spread creation times over a year, bulk_create stamps them all with now
+            cursor.execute(
+                f"UPDATE {table} SET created_at = now() - random() * interval '365 days' WHERE category_id = %s",
+                [category.pk]
+            )
+        self.stdout.write(f'  seeded {count} threads in {time.perf_counter() - start:.2f} s')
+
+        start = time.perf_counter()
+        rescored = ranking.refresh(full=True)
+        self.stdout.write(f'  full refresh          {rescored} rescored in {time.perf_counter() - start:8.2f} s')
+        touched = rng.sample(range(count), int(count * options['touched']))
+        pks = list(Thread.objects.filter(category=category).order_by('pk').values_list('pk', flat=True))
+        Thread.objects.filter(pk__in=[pks[i] for i in touched]).update(upvote_count=1000, updated_at=timezone.now())
+        start = time.perf_counter()
+        rescored = ranking.refresh(overlap=0)
+        self.stdout.write(f'  incremental refresh   {rescored} rescored in {time.perf_counter() - start:8.2f} s')
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {table}')
+
+        threads = Thread.objects.filter(category=category, is_deleted=False)
+        size = options['page_size'] + 1
+        self.report('indexed hot_score', options['requests'], lambda: list(threads.order_by('-hot_score', '-id')[:size]))
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name("thread_category_hot_idx")}')
+                self.report('hot_score, no index', options['requests'], lambda: list(threads.order_by('-hot_score', '-id')[:size]))
+                raise Rollback
+        except Rollback:
+            pass
+        computed = RawSQL(
+            'LOG(GREATEST(upvote_count + %s * reply_count, 1)) + (EXTRACT(EPOCH FROM created_at) - %s) / %s',
+            (ranking.REPLY_WEIGHT, ranking.EPOCH, ranking.GRAVITY)
+        )
+        self.report('computed per request', options['requests'], lambda: list(threads.annotate(score=computed).order_by('-score', '-id')[:size]))
+
+    def report(self, name, requests, query):
+        query()
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - start) * 1000)
+        p95 = quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+        self.stdout.write(f'  {name:<22} p50 {median(samples):8.2f} ms   p95 {p95:8.2f} ms')
@@ -0,0 +1,110 @@
+"""
+Outbound Mail Benchmark
+=======================
+Compares the old thread-per-email delivery (one SMTP connection per message)
+against the outbox worker (batches over one connection) using a local
+aiosmtpd sink. `--smtp-latency` adds a per-command delay to the sink to
+approximate a remote relay. Outbox rows are rolled back afterwards.
+
+Requires `aiosmtpd` (listed in requirements.txt).
+
+Usage:
+    python manage.py bench_mail
+    python manage.py bench_mail --messages 2000 --batch-size 200 --smtp-latency 5
+"""
+
+import asyncio
+import socket
+import threading
+import time
+import uuid
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from threads.models import OutboundMail
+from threads.utils import queue_mass_mail, send_queued_mail
+
+
+class Rollback(Exception):
+    pass
+
+
+class Sink:
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.received = 0
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        await asyncio.sleep(self.latency)
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks thread-per-email delivery against the batched outbox worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='Messages sent per strategy (default: 500)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Outbox batch size (default: 100)')
+        parser.add_argument('--smtp-latency', type=float, default=2, help='Milliseconds the sink waits per SMTP command (default: 2)')
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            raise CommandError('aiosmtpd is not installed, run `pip install aiosmtpd`')
+
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            host, port = s.getsockname()
+        sink = Sink(options['smtp_latency'] / 1000)
+        controller = Controller(sink, hostname=host, port=port)
+        controller.start()
+        try:
+            connect = lambda fail_silently=False: get_connection('django.core.mail.backends.smtp.EmailBackend', fail_silently=fail_silently, host=host, port=port, use_tls=False, use_ssl=False, username='', password='', timeout=30)
+            count = options['messages']
+            run = uuid.uuid4().hex[:8]
+            messages = [(f'Benchmark {run} #{i}', 'benchmark', 'bench@localhost', [f'user{i}@localhost']) for i in range(count)]
+
+            sink.received = 0
+            start = time.perf_counter()
+            workers = [
+                threading.Thread(target=lambda m=m: connect(fail_silently=True).send_messages([EmailMessage(*m)]))
+                for m in messages
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.report('thread per email', count, sink.received, time.perf_counter() - start)
+
+            sink.received = 0
+            try:
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    queue_mass_mail(messages)
+                    queued = time.perf_counter() - start
+                    connection = connect()
+                    while True:
+                        sent, failed = send_queued_mail(options['batch_size'], connection=connection)
+                        if sent + failed == 0:
+                            break
+                    elapsed = time.perf_counter() - start
+                    pending = OutboundMail.objects.filter(subject__startswith=f'Benchmark {run}').exclude(status=OutboundMail.StatusChoices.SENT).count()
+                    self.report(f'outbox (batch {options["batch_size"]})', count, sink.received, elapsed)
+                    self.stdout.write(f'  enqueue {queued * 1000:8.2f} ms   not sent {pending}')
+                    raise Rollback
+            except Rollback:
+                pass
+        finally:
+            controller.stop()
+        self.stdout.write(self.style.SUCCESS('\n✓ Benchmark complete, outbox rows rolled back'))
+
+    def report(self, name, count, received, elapsed):
+        self.stdout.write(f'  {name:<24} {received}/{count} delivered in {elapsed:8.2f} s   {received / elapsed:8.1f} msg/s')
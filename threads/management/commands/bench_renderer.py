@@ -0,0 +1,82 @@
+"""
+Markdown Renderer Micro-Benchmark
+=================================
+Compares the legacy per-call render path (fresh `markdown.markdown` plus
+`bleach.clean` with literal allow-lists) against the shared, per-thread
+renderer in `threads.renderer`, with and without the render cache, on a
+synthetic mix of post sizes.
+
+Usage:
+    python manage.py bench_renderer
+    python manage.py bench_renderer --posts 5000 --rounds 5
+"""
+
+import random
+import statistics
+import time
+import bleach
+import markdown
+from faker import Faker
+from django.core.management.base import BaseCommand
+from threads import renderer
+
+
+def legacy_render(raw_content):
+    markdown_content = markdown.markdown(text=raw_content, extensions=['extra', 'nl2br', 'codehilite'])
+    allowed_tags = ['p', 'br', 'strong', 'em', 'u', 'blockquote', 'h1', 'h2', 'h3', 'ul', 'ol', 'li', 'code', 'pre', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'a']
+    allowed_attrs = {'a': ['href', 'title', 'target'], '*': ['class']}
+    allowed_protocols = ['http', 'https', 'mailto']
+    return bleach.clean(text=markdown_content, tags=allowed_tags, attributes=allowed_attrs, protocols=allowed_protocols)
+
+
+def generate_posts(count, seed):
+    fake = Faker('en_IN')
+    Faker.seed(seed)
+    rng = random.Random(seed)
+    posts = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            posts.append(rng.choice(['thanks!', '+1', 'same question', fake.sentence()]))
+        elif kind < 0.75:
+            posts.append('\n\n'.join(fake.paragraph(nb_sentences=5) for _ in range(rng.randint(1, 4))))
+        elif kind < 0.9:
+            code = '\n'.join(f'    x{i} = compute({i}, "{fake.word()}")' for i in range(rng.randint(5, 40)))
+            posts.append(f'{fake.sentence()}\n\n    :::python\n{code}\n\n**{fake.word()}**')
+        else:
+            rows = '\n'.join(f'| {fake.word()} | {rng.randint(0, 100)} |' for _ in range(rng.randint(3, 20)))
+            posts.append(f'## {fake.sentence()}\n\n| Name | Score |\n| --- | --- |\n{rows}\n\n> {fake.sentence()}')
+    return posts
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the shared Markdown/bleach renderer against the legacy per-call path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Number of synthetic posts (default: 1000)')
+        parser.add_argument('--rounds', type=int, default=3, help='Timed rounds per renderer (default: 3)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic posts (default: 42)')
+
+    def handle(self, *args, **options):
+        posts = generate_posts(options['posts'], options['seed'])
+        total_bytes = sum(len(post) for post in posts)
+        self.stdout.write(f'{len(posts)} posts, {total_bytes / 1024:.1f} KiB of Markdown, {options["rounds"]} rounds\n')
+
+        mismatches = sum(1 for post in posts if legacy_render(post) != renderer.convert(post))
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'⚠️  {mismatches} posts render differently between the two paths'))
+
+        results = {}
+        renderer.render_cache.clear()
+        for name, func in (('legacy', legacy_render), ('shared', renderer.convert), ('cached', renderer.render)):
+            timings = []
+            for _ in range(options['rounds']):
+                start = time.perf_counter()
+                for post in posts:
+                    func(post)
+                timings.append(time.perf_counter() - start)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f'  {name:<8} median {results[name] * 1000:8.1f} ms  ({results[name] / len(posts) * 1e6:7.1f} µs/post)')
+
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Speedup: {results["legacy"] / results["shared"]:.2f}x shared, {results["legacy"] / results["cached"]:.2f}x cached'))
+        self.stdout.write(f'  Render cache: {renderer.render_cache.stats()}')
@@ -0,0 +1,114 @@
+"""
+Thread Search Backend Benchmark
+===============================
+Compares the trigram join-table backend against the PostgreSQL backend on a
+throwaway category filled with synthetic titles. Every size runs inside a
+transaction that is rolled back afterwards, so nothing is left behind.
+
+Usage:
+    python manage.py bench_search
+    python manage.py bench_search --sizes 10000 100000 --queries 100
+"""
+
+import random
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from threads.models import Category, Thread, Trigram
+from threads.search import TrigramTableBackend, PostgresSearchBackend, trigrams
+
+User = get_user_model()
+
+WORDS = [
+    'handout', 'midsem', 'compre', 'quiz', 'grading', 'attendance', 'tutorial', 'assignment', 'lab', 'project',
+    'programming', 'algorithms', 'database', 'networks', 'operating', 'systems', 'machine', 'learning', 'physics',
+    'chemistry', 'mathematics', 'probability', 'statistics', 'economics', 'management', 'ethics', 'thermodynamics',
+    'electrical', 'mechanics', 'waves', 'library', 'hostel', 'internship', 'placement', 'professor', 'review',
+    'resources', 'papers', 'notes', 'doubt', 'deadline', 'semester', 'elective', 'registration', 'lecture'
+]
+PROMPTS = [
+    'midsem papers', 'grading professor', 'operating systems lab', 'machine lerning', 'thermodynamcs notes',
+    'database project', 'probability quiz', 'hostel library', 'internship review', 'compre deadline'
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the available thread search backends at several table sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help='Thread counts to benchmark (default: 10000 100000 1000000)')
+        parser.add_argument('--queries', type=int, default=50, help='Timed searches per backend and size (default: 50)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert (default: 5000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for titles and prompts (default: 42)')
+
+    def handle(self, *args, **options):
+        backends = [TrigramTableBackend()]
+        if connection.vendor == 'postgresql':
+            backends.append(PostgresSearchBackend())
+        else:
+            self.stdout.write(self.style.WARNING('⚠️  Not running on PostgreSQL, only the trigram table backend is benchmarked'))
+
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    rng = random.Random(options['seed'])
+                    category = self.populate(size, rng, options['batch_size'])
+                    self.stdout.write(f'\n{size} threads')
+                    for backend in backends:
+                        timings = self.run(backend, category, rng, options['queries'])
+                        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+                        self.stdout.write(f'  {backend.__class__.__name__:<24} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms')
+                    raise Rollback
+            except Rollback:
+                pass
+        self.stdout.write(self.style.SUCCESS('\n✓ Benchmark complete, all synthetic rows rolled back'))
+
+    def populate(self, size, rng, batch_size):
+        author = User.objects.order_by('pk').first() or User.objects.create_user(username=f'bench-{uuid.uuid4().hex[:8]}')
+        category = Category.objects.create(name=f'bench-{uuid.uuid4().hex}')
+        for start in range(0, size, batch_size):
+            Thread.objects.bulk_create([
+                Thread(
+                    title=' '.join(rng.sample(WORDS, rng.randint(3, 7))),
+                    raw_content='benchmark',
+                    author=author,
+                    category=category
+                )
+                for _ in range(min(batch_size, size - start))
+            ], batch_size=batch_size)
+
+        Through = Thread.trigrams.through
+        values = set()
+        rows = list(Thread.objects.filter(category=category).values_list('pk', 'title'))
+        for _, title in rows:
+            values |= trigrams(title)
+        Trigram.objects.bulk_create([Trigram(value=value) for value in values], ignore_conflicts=True, batch_size=batch_size)
+        ids = dict(Trigram.objects.filter(value__in=values).values_list('value', 'pk'))
+        links = [Through(thread_id=pk, trigram_id=ids[value]) for pk, title in rows for value in trigrams(title)]
+        for start in range(0, len(links), batch_size):
+            Through.objects.bulk_create(links[start:start + batch_size])
+
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import SearchVector
+            Thread.objects.filter(category=category).update(
+                search_vector=SearchVector('title', weight='A') + SearchVector('raw_content', weight='B')
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Thread._meta.db_table}, {Through._meta.db_table}, {Trigram._meta.db_table}')
+        return category
+
+    def run(self, backend, category, rng, queries):
+        timings = []
+        for _ in range(queries):
+            prompt = rng.choice(PROMPTS)
+            start = time.perf_counter()
+            list(backend.search(Thread.objects.filter(category=category, is_deleted=False), prompt).order_by('-created_at')[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,41 @@
+"""
+Flush Counter Deltas
+====================
+Folds pending `CounterDelta` rows into `Thread.upvote_count`,
+`Thread.reply_count` and `Reply.upvote_count`. Each batch becomes one
+`UPDATE ... FROM (VALUES ...)` per model on PostgreSQL. Deltas are claimed
+with `SKIP LOCKED`, so several flushers can run side by side.
+
+Usage:
+    python manage.py flush_counters
+    python manage.py flush_counters --once
+    python manage.py flush_counters --batch-size 5000 --interval 2
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from threads import counters
+
+
+class Command(BaseCommand):
+    help = 'Periodically folds counter deltas into the denormalized counter columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Deltas folded per transaction (default: 1000)')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep once no deltas are pending (default: 5)')
+        parser.add_argument('--once', action='store_true', help='Flush everything that is pending and exit')
+
+    def handle(self, *args, **options):
+        flushed = 0
+        while True:
+            close_old_connections()
+            applied = counters.flush(options['batch_size'])
+            flushed += applied
+            if applied:
+                self.stdout.write(f'  {applied} deltas folded')
+            if applied < options['batch_size']:
+                if options['once']:
+                    self.stdout.write(self.style.SUCCESS(f'✓ {flushed} deltas folded'))
+                    return
+                time.sleep(options['interval'])
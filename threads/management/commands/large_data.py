@@ -21,16 +21,17 @@ import os
 import sys
 import logging
 from concurrent.futures import ProcessPoolExecutor, as_completed
-from unittest.mock import patch
 from faker import Faker
 from django.core.management.base import BaseCommand
 from django.db import transaction, connections, OperationalError, IntegrityError
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core import mail
+from django.core.management import call_command
 
 # Import your models
 from courses.models import Department, Course, Resource
+from threads import events, handlers
 from threads.models import Category, Tag, Thread, Reply, Report
 
 # Optional fancy output
@@ -145,12 +146,12 @@ def create_content_worker(count, user_ids, course_map, cat_ids, tag_ids):
     # SAFETY: Override Settings in this process
     settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
     
-    # SAFETY: Patch Email functions
-    p1 = patch('threads.utils.queue_mail')
-    p2 = patch('threads.utils.queue_mass_mail')
-    p1.start()
-    p2.start()
+    # SAFETY: Reply and mention notifications would end up in digests, the only mail the outbox sends
+    with events.suppress(handlers.notify_thread_authors, handlers.sync_mentions):
+        return create_content(count, user_ids, course_map, cat_ids, tag_ids)
 
+
+def create_content(count, user_ids, course_map, cat_ids, tag_ids):
     # Reset DB Connection
     connections.close_all()
     
@@ -228,8 +229,6 @@ def create_content_worker(count, user_ids, course_map, cat_ids, tag_ids):
                 logger.exception(f"Error creating thread: {e}")
                 break
 
-    p1.stop()
-    p2.stop()
     return created
 
 
@@ -296,7 +295,7 @@ class Command(BaseCommand):
             self._print(f"  {Fore.CYAN}Replies:{Style.RESET_ALL} {stats['replies']}")
             
             self._print(f"\n{Fore.MAGENTA}⏱️  Time Taken:{Style.RESET_ALL} {duration:.2f}s")
-            self._print(f"{Fore.MAGENTA}📧 Emails Intercepted:{Style.RESET_ALL} {len(mail.outbox)} (None sent)\n")
+            self._print(f"{Fore.MAGENTA}📧 Emails Intercepted:{Style.RESET_ALL} {len(getattr(mail, 'outbox', []))} (None sent)\n")
         else:
             self._print("\n" + "="*80)
             self._print("✓ POPULATION COMPLETED".center(80))
@@ -304,7 +303,7 @@ class Command(BaseCommand):
             self._print(f"\n📊 Summary: Users={stats['users']}, Threads={stats['threads']}, "
                        f"Replies={stats['replies']}")
             self._print(f"⏱️  Time: {duration:.2f}s")
-            self._print(f"📧 Emails Intercepted: {len(mail.outbox)}\n")
+            self._print(f"📧 Emails Intercepted: {len(getattr(mail, 'outbox', []))}\n")
 
     def handle(self, *args, **options):
         # Override configuration from arguments
@@ -345,6 +344,9 @@ class Command(BaseCommand):
         else:
             self._print(f"[2/3] Generating {total_threads} threads with {workers} workers...\n")
         
+        # Forked workers close what they inherit, which would end this process's session too
+        connections.close_all()
+
         chunk_size = total_threads // workers
         remainder = total_threads % workers
         tasks = [chunk_size + (1 if i < remainder else 0) for i in range(workers)]
@@ -387,6 +389,9 @@ class Command(BaseCommand):
                     except Exception as e:
                         self._print(f"  ✗ Worker Error: {e}")
 
+        # The workers skipped mention handling, record the rows without notifying anyone
+        call_command('backfill_mentions')
+
         # 3. FINAL STATISTICS
         if HAS_FANCY_OUTPUT:
             self._print(f"\n{Fore.YELLOW}{Style.BRIGHT}[3/3] Collecting Statistics...{Style.RESET_ALL}")
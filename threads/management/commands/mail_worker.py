@@ -0,0 +1,49 @@
+"""
+Outbound Mail Worker
+====================
+Drains the `OutboundMail` outbox in batches over one SMTP connection per
+batch. Failed messages are retried with exponential backoff and marked as
+failed after `--max-attempts`. Rows are claimed with `SELECT ... FOR UPDATE
+SKIP LOCKED` and leased for a few minutes, so several workers can run side by
+side and no transaction stays open while SMTP is slow.
+
+Usage:
+    python manage.py mail_worker
+    python manage.py mail_worker --once
+    python manage.py mail_worker --batch-size 200 --interval 2
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from threads.utils import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Sends queued outbound mail in batches with retries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages claimed and sent per batch (default: 100)')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the outbox is empty (default: 5)')
+        parser.add_argument('--max-attempts', type=int, default=8, help='Attempts before a message is marked as failed (default: 8)')
+        parser.add_argument('--retry-delay', type=int, default=60, help='Base retry delay in seconds, doubled on every attempt (default: 60)')
+        parser.add_argument('--once', action='store_true', help='Drain everything that is due and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                sent, failed = send_queued_mail(options['batch_size'], options['max_attempts'], options['retry_delay'])
+            except Exception as e:
+                # Usually the SMTP server refusing the connection, the batch is retried as is once its lease expires
+                self.stderr.write(self.style.ERROR(f'❌ Batch failed: {e.__class__.__name__}: {e}'))
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+            if sent or failed:
+                self.stdout.write(f'  {sent} sent, {failed} failed')
+            if sent + failed < options['batch_size']:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,42 @@
+"""
+Rebuild the Thread Search Index
+===============================
+Re-indexes every thread through the configured search backend. Needed after
+switching `THREADS_SEARCH_BACKEND`, since each backend keeps its own index.
+
+Usage:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from threads.models import Thread
+from threads.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Re-indexes all threads with the configured search backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of threads loaded per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        batch_size = options['batch_size']
+        last_pk = 0
+        indexed = 0
+        while True:
+            batch = list(Thread.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            for thread in batch:
+                backend.index(thread)
+            last_pk = batch[-1].pk
+            indexed += len(batch)
+            self.stdout.write(f'  {indexed} threads indexed (up to pk {last_pk})')
+        self.stdout.write(self.style.SUCCESS(f'✓ {indexed} threads indexed with {backend.__class__.__name__}'))
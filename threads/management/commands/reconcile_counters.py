@@ -0,0 +1,113 @@
+"""
+Reconcile Denormalized Counters
+===============================
+Recomputes `Thread.reply_count`, `Thread.upvote_count` and
+`Reply.upvote_count` from the replies and vote rows, walking primary keys in
+bounded chunks. Each chunk is one SELECT that finds drifted rows and one
+UPDATE that fixes them, both set-based. Deltas that have not been flushed yet
+are subtracted, the stored column plus its pending deltas ends up exact. The
+UPDATE runs in a short transaction that first locks the chunk's pending
+deltas, flushers skip locked deltas, so none is folded between the pending
+total being read and the column being written, and it is safe to run online.
+
+Usage:
+    python manage.py reconcile_counters
+    python manage.py reconcile_counters --dry-run
+    python manage.py reconcile_counters --chunk-size 20000 --pause 0.1
+"""
+
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
+from threads import counters
+from threads.models import CounterDelta, Thread, Reply, ThreadVote, ReplyVote
+
+BUCKETS = [(-float('inf'), -100), (-99, -10), (-9, -2), (-1, -1), (1, 1), (2, 9), (10, 99), (100, float('inf'))]
+
+
+def count(queryset, field):
+    total = queryset.filter(**{field: models.OuterRef('pk')}).order_by().values(field).annotate(total=models.Count('pk')).values('total')
+    return Coalesce(models.Subquery(total), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes reply and upvote counts in chunks and reports how far they had drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Primary keys checked per chunk (default: 5000)')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between chunks to leave room for live traffic (default: 0)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        targets = [
+            (Thread, {
+                'reply_count': count(Reply.objects.filter(is_deleted=False), 'thread'),
+                'upvote_count': count(ThreadVote.objects.all(), 'thread')
+            }),
+            (Reply, {
+                'upvote_count': count(ReplyVote.objects.all(), 'reply')
+            })
+        ]
+        for model, truths in targets:
+            self.reconcile(model, truths, options['chunk_size'], options['pause'], options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('⚠️  Dry run, nothing was written'))
+
+    def reconcile(self, model, truths, chunk_size, pause, dry_run):
+        name = model._meta.verbose_name_plural
+        expected = {field: Greatest(truth - counters.pending(model, field), 0) for field, truth in truths.items()}
+        bounds = model.objects.aggregate(low=models.Min('pk'), high=models.Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write(f'{name}: nothing to reconcile')
+            return
+        drift = {field: Counter() for field in truths}
+        fixed = 0
+        for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            chunk = model.objects.filter(pk__gte=start, pk__lt=start + chunk_size)
+            rows = list(
+                chunk.annotate(**{f'expected_{field}': expression for field, expression in expected.items()})
+                .filter(self.drifted(truths))
+                .values('pk', *truths, *(f'expected_{field}' for field in truths))
+            )
+            for row in rows:
+                for field in truths:
+                    if row[field] != row[f'expected_{field}']:
+                        drift[field][self.bucket(row[field] - row[f'expected_{field}'])] += 1
+            if rows and not dry_run:
+                pks = [row['pk'] for row in rows]
+                with transaction.atomic():
+                    # A flush already holding some of them finishes first, the UPDATE then reads what it left
+                    list(CounterDelta.objects.select_for_update().filter(target=model._meta.model_name, object_id__in=pks).values_list('pk', flat=True))
+                    fixed += chunk.filter(pk__in=pks).update(**expected)
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(f'\n{name}')
+        for field, histogram in drift.items():
+            total = sum(histogram.values())
+            self.stdout.write(f'  {field}: {total} drifted')
+            for bucket in BUCKETS:
+                if histogram[bucket]:
+                    self.stdout.write(f'    {self.label(bucket):>12}  {histogram[bucket]}')
+        self.stdout.write(self.style.SUCCESS(f'✓ {name}: {fixed} rows fixed'))
+
+    def drifted(self, truths):
+        condition = models.Q()
+        for field in truths:
+            condition |= ~models.Q(**{field: models.F(f'expected_{field}')})
+        return condition
+
+    def bucket(self, difference):
+        return next(bucket for bucket in BUCKETS if bucket[0] <= difference <= bucket[1])
+
+    def label(self, bucket):
+        low, high = bucket
+        if low == high:
+            return f'{low:+d}'
+        if low == -float('inf'):
+            return f'<= {high:+d}'
+        if high == float('inf'):
+            return f'>= {low:+d}'
+        return f'{low:+d}..{high:+d}'
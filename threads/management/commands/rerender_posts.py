@@ -0,0 +1,59 @@
+"""
+Re-render stored Markdown for Threads and Replies
+=================================================
+Refreshes `rendered_content` for every post whose stored HTML was produced
+from a different `raw_content` or by an older renderer configuration
+(Markdown extensions, bleach allow-lists or library versions).
+
+Usage:
+    python manage.py rerender_posts
+    python manage.py rerender_posts --batch-size 1000
+    python manage.py rerender_posts --verify
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from threads.models import Thread, Reply
+from threads.renderer import RENDERER_HASH
+
+
+class Command(BaseCommand):
+    help = 'Re-renders stale pre-rendered Markdown on Threads and Replies in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows rendered and written per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Also scan rows rendered by the current renderer and fix content hash mismatches'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (Thread, Reply):
+            updated = self.rerender(model, batch_size, options['verify'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {model._meta.verbose_name_plural}: {updated} re-rendered'))
+
+    def rerender(self, model, batch_size, verify):
+        fields = ['rendered_content', 'content_hash', 'renderer_hash']
+        queryset = model.objects.all() if verify else model.objects.exclude(renderer_hash=RENDERER_HASH)
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').only('pk', 'raw_content', *fields)[:batch_size]
+            )
+            if not batch:
+                return updated
+            last_pk = batch[-1].pk
+            stale = [post for post in batch if post.render()]
+            if stale:
+                with transaction.atomic():
+                    model.objects.bulk_update(stale, fields)
+                updated += len(stale)
+                self.stdout.write(f'  {model._meta.verbose_name_plural}: {updated} re-rendered (up to pk {last_pk})')
@@ -0,0 +1,123 @@
+"""
+Send Notification Digests
+=========================
+Coalesces pending reply and mention notifications into one email per user.
+A user is due once their oldest pending notification is older than their
+window: `THREADS_DIGEST_WINDOW` minutes for frequent digests, one day for
+daily ones. Digests are written to the mail outbox and delivered in batches
+by `mail_worker`.
+
+Usage:
+    python manage.py send_digests
+    python manage.py send_digests --once
+    python manage.py send_digests --batch-size 200 --interval 30
+"""
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import Min, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from threads.models import Notification
+from threads.utils import queue_mass_mail
+
+User = get_user_model()
+
+SITE_URL = 'https://forumdeck.sreyash.tech'
+
+
+class Command(BaseCommand):
+    help = 'Sends one digest email per user for their pending notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Users digested per transaction (default: 100)')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between scheduler passes (default: 60)')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            sent = self.run(options['batch_size'])
+            if sent:
+                self.stdout.write(f'  {sent} digests queued')
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'✓ {sent} digests queued'))
+                return
+            time.sleep(options['interval'])
+
+    def run(self, batch_size):
+        now = timezone.now()
+        frequent = now - timedelta(minutes=settings.THREADS_DIGEST_WINDOW)
+        daily = now - timedelta(days=1)
+        due = (
+            User.objects
+            .annotate(oldest=Min('notifications__created_at', filter=Q(notifications__digested_at__isnull=True)))
+            .filter(
+                Q(digest_frequency=User.DigestChoices.FREQUENT, oldest__lte=frequent) |
+                Q(digest_frequency=User.DigestChoices.DAILY, oldest__lte=daily)
+            )
+            .order_by('pk')
+        )
+        sent = 0
+        last_pk = 0
+        while True:
+            users = list(due.filter(pk__gt=last_pk).only('pk', 'username', 'full_name', 'email')[:batch_size])
+            if not users:
+                return sent
+            last_pk = users[-1].pk
+            with transaction.atomic():
+                sent += self.digest(users, now)
+
+    def digest(self, users, now):
+        pending = (
+            Notification.objects
+            .select_for_update(of=('self', ))
+            .filter(recipient__in=users, digested_at__isnull=True, created_at__lte=now)
+            .select_related('actor', 'thread__category')
+            .only('recipient_id', 'kind', 'actor__username', 'thread__title', 'thread__category__name')
+            .order_by('created_at')
+        )
+        grouped = defaultdict(dict)
+        ids = []
+        latest = {}
+        for notification in pending:
+            ids.append(notification.pk)
+            latest[notification.recipient_id] = max(latest.get(notification.recipient_id, 0), notification.pk)
+            entry = grouped[notification.recipient_id].setdefault(notification.thread_id, {
+                'thread': notification.thread,
+                'url': reverse('threads:thread_detail', kwargs={'pk': notification.thread_id, 'order_by': '-created_at'}),
+                'replies': 0, 'repliers': [], 'mentions': 0, 'mentioners': []
+            })
+            if notification.kind == Notification.KindChoices.REPLY:
+                key, names = 'replies', 'repliers'
+            else:
+                key, names = 'mentions', 'mentioners'
+            entry[key] += 1
+            if notification.actor.username not in entry[names]:
+                entry[names].append(notification.actor.username)
+
+        messages = []
+        for user in users:
+            entries = list(grouped.get(user.pk, {}).values())
+            if not entries or not user.email:
+                continue
+            replies = sum(entry['replies'] for entry in entries)
+            mentions = sum(entry['mentions'] for entry in entries)
+            parts = []
+            if replies:
+                parts.append(f'{replies} new repl{"y" if replies == 1 else "ies"}')
+            if mentions:
+                parts.append(f'{mentions} mention{"" if mentions == 1 else "s"}')
+            subject = f'{" and ".join(parts)} on ForumDeck'
+            body = render_to_string('threads/email/digest.txt', {'user': user, 'entries': entries, 'site': SITE_URL})
+            # Keyed by what it digests, a later digest with the same wording is still a new mail
+            messages.append((subject, body, settings.DEFAULT_FROM_EMAIL, [user.email], f'digest:{user.pk}:{latest[user.pk]}'))
+        queue_mass_mail(messages)
+        Notification.objects.filter(pk__in=ids).update(digested_at=now)
+        return len(messages)
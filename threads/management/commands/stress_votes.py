@@ -0,0 +1,83 @@
+"""
+Upvote Concurrency Stress Test
+==============================
+Hammers a single throwaway thread with parallel voters toggling upvotes for a
+shared pool of users, then checks that `upvote_count` equals the number of
+vote rows, both read exactly with pending deltas and after flushing them. Needs PostgreSQL, since SQLite serializes every writer anyway.
+All synthetic users, the category and the thread are deleted afterwards.
+
+Usage:
+    python manage.py stress_votes
+    python manage.py stress_votes --voters 32 --toggles 500 --users 20
+"""
+
+import random
+import threading
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from threads import counters
+from threads.models import Category, Thread, ThreadVote
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Toggles upvotes on one thread from many connections and verifies the counter stays exact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=16, help='Parallel voter threads, one connection each (default: 16)')
+        parser.add_argument('--toggles', type=int, default=200, help='Toggles per voter (default: 200)')
+        parser.add_argument('--users', type=int, default=10, help='Users shared by all voters, fewer means more conflicts (default: 10)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('stress_votes needs PostgreSQL to exercise concurrent writers')
+
+        run = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create([User(username=f'stress-{run}-{i}') for i in range(options['users'])])
+        category = Category.objects.create(name=f'stress-{run}')
+        thread = Thread.objects.create(title=f'Stress {run}', raw_content='stress', author=users[0], category=category)
+        errors = []
+
+        def vote(seed):
+            rng = random.Random(seed)
+            try:
+                post = Thread.objects.get(pk=thread.pk)
+                for _ in range(options['toggles']):
+                    post.update_upvotes(rng.choice(users))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        try:
+            voters = [threading.Thread(target=vote, args=(options['seed'] + i, )) for i in range(options['voters'])]
+            start = time.perf_counter()
+            for voter in voters:
+                voter.start()
+            for voter in voters:
+                voter.join()
+            elapsed = time.perf_counter() - start
+
+            total = options['voters'] * options['toggles']
+            exact = Thread.objects.with_exact_counts().get(pk=thread.pk).exact_upvote_count
+            while counters.flush():
+                pass
+            thread.refresh_from_db(fields=['upvote_count'])
+            rows = ThreadVote.objects.filter(thread=thread).count()
+            self.stdout.write(f'  {total} toggles in {elapsed:.2f} s ({total / elapsed:.0f}/s), {len(errors)} errors')
+            self.stdout.write(f'  upvote_count {thread.upvote_count} (exact before flushing {exact}), vote rows {rows}')
+            for error in errors[:5]:
+                self.stderr.write(f'  {error.__class__.__name__}: {error}')
+        finally:
+            thread.delete()
+            category.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        if errors or thread.upvote_count != rows or exact != rows:
+            raise CommandError('❌ Upvote counter drifted from the vote rows')
+        self.stdout.write(self.style.SUCCESS('✓ Upvote counter matches the vote rows'))
@@ -0,0 +1,42 @@
+import re
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+# Usernames follow Django's UnicodeUsernameValidator, the lookbehind skips email addresses
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]{1,150})')
+
+CACHE_KEY = 'mentions:user:{}'
+MISSING = ()
+
+
+def parse_mentions(raw: str) -> set[str]:
+    return {match.rstrip('.') for match in MENTION_RE.findall(raw or '')} - {''}
+
+
+def resolve_usernames(usernames) -> dict[str, tuple[int, str, bool]]:
+    """Maps usernames to (id, email, wants_digest), unknown usernames are left out"""
+    usernames = set(usernames)
+    if not usernames:
+        return {}
+    keys = {CACHE_KEY.format(username): username for username in usernames if len(username) <= 150}
+    cached = cache.get_many(keys)
+    resolved = {keys[key]: value for key, value in cached.items()}
+    missing = set(keys.values()) - resolved.keys()
+    if missing:
+        User = get_user_model()
+        rows = User.objects.filter(username__in=missing).values_list('username', 'pk', 'email', 'digest_frequency')
+        found = {
+            username: (pk, email, digest_frequency != User.DigestChoices.NEVER)
+            for username, pk, email, digest_frequency in rows
+        }
+        cache.set_many(
+            {CACHE_KEY.format(username): found.get(username, MISSING) for username in missing},
+            timeout=settings.THREADS_MENTION_CACHE_TTL
+        )
+        resolved.update(found)
+    return {username: value for username, value in resolved.items() if value != MISSING}
+
+
+def forget_username(username: str) -> None:
+    cache.delete(CACHE_KEY.format(username))
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0003_alter_category_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reply',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='rendered_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='rendered content'),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='renderer_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='renderer hash'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='rendered_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='rendered content'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='renderer_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='renderer hash'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 01:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0004_post_rendered_content'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['thread', 'is_deleted', '-created_at', '-id'], name='reply_thread_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['thread', 'is_deleted', '-upvote_count', '-id'], name='reply_thread_upvotes_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 01:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('threads', '0005_reply_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['category', 'is_deleted', '-created_at', '-id'], name='thread_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['category', 'is_deleted', '-upvote_count', '-id'], name='thread_category_upvotes_idx'),
+        ),
+    ]
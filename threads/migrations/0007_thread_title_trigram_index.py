@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 01:15
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS thread_title_trgm_idx ON threads_thread USING gin (title gin_trgm_ops)')
+    # pg_trgm replaces the join table as the search index; it is kept only for the non-PostgreSQL fallback
+    schema_editor.execute('TRUNCATE threads_thread_trigrams, threads_trigram')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS thread_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0006_thread_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='thread',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='thread_title_trgm_idx', opclasses=['gin_trgm_ops']),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_index, drop_trigram_index),
+            ],
+        ),
+    ]
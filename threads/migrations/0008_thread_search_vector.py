@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 01:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS thread_search_vector_idx ON threads_thread USING gin (search_vector)')
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS thread_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0007_thread_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='thread',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='thread_search_vector_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_vector_index, drop_search_vector_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 01:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0009_outbound_mail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('REPLY', 'Reply'), ('MENTION', 'Mention')], max_length=7, verbose_name='kind')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('digested_at', models.DateTimeField(blank=True, null=True, verbose_name='digested at')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='actor')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='recipient')),
+                ('reply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='threads.reply', verbose_name='reply')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='threads.thread', verbose_name='thread')),
+            ],
+            options={
+                'verbose_name': 'Notification',
+                'verbose_name_plural': 'Notifications',
+                'indexes': [models.Index(fields=['recipient', 'digested_at', 'created_at'], name='notification_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 01:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0010_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('reply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='threads.reply', verbose_name='reply')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='threads.thread', verbose_name='thread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'Mention',
+                'verbose_name_plural': 'Mentions',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reply__isnull', True)), fields=('user', 'thread'), name='mention_unique_thread'), models.UniqueConstraint(condition=models.Q(('reply__isnull', False)), fields=('user', 'reply'), name='mention_unique_reply')],
+            },
+        ),
+    ]
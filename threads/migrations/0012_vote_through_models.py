@@ -0,0 +1,59 @@
+# Generated by Django 6.0 on 2026-10-18 01:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0011_mention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The tables already exist as the auto-created M2M tables, only the state changes
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ReplyVote',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('reply', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='threads.reply', verbose_name='reply')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+                    ],
+                    options={
+                        'verbose_name': 'Reply Vote',
+                        'verbose_name_plural': 'Reply Votes',
+                        'db_table': 'threads_reply_upvotes',
+                        'unique_together': {('reply', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='reply',
+                    name='upvotes',
+                    field=models.ManyToManyField(blank=True, related_name='upvoted_reply', through='threads.ReplyVote', to=settings.AUTH_USER_MODEL, verbose_name='upvotes'),
+                ),
+                migrations.CreateModel(
+                    name='ThreadVote',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='threads.thread', verbose_name='thread')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+                    ],
+                    options={
+                        'verbose_name': 'Thread Vote',
+                        'verbose_name_plural': 'Thread Votes',
+                        'db_table': 'threads_thread_upvotes',
+                        'unique_together': {('thread', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='thread',
+                    name='upvotes',
+                    field=models.ManyToManyField(blank=True, related_name='upvoted_thread', through='threads.ThreadVote', to=settings.AUTH_USER_MODEL, verbose_name='upvotes'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0012_vote_through_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=16, verbose_name='target')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='object id')),
+                ('field', models.CharField(max_length=32, verbose_name='field')),
+                ('delta', models.IntegerField(verbose_name='delta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'Counter Delta',
+                'verbose_name_plural': 'Counter Deltas',
+                'indexes': [models.Index(fields=['target', 'object_id', 'field'], name='counter_delta_target_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0013_counter_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reply',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='version'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='version'),
+        ),
+    ]
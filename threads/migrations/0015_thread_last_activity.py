@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 01:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0014_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='last activity at'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['category', 'is_deleted', '-last_activity_at', '-id'], name='thread_category_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-18 02:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0015_thread_last_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='name')),
+                ('position', models.DateTimeField(verbose_name='position')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint',
+                'verbose_name_plural': 'Checkpoints',
+            },
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='hot score'),
+        ),
+        # Existing threads start as updated now, so the first refresh_hot_scores run scores all of them
+        migrations.AddField(
+            model_name='thread',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='updated at'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['category', 'is_deleted', '-hot_score', '-id'], name='thread_category_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['updated_at', 'id'], name='thread_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0016_thread_hot_score'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboundmail',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='dedupe key'),
+        ),
+    ]
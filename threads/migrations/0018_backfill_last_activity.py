@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_activity(apps, schema_editor):
+    # 0015 stamped every existing thread with the migration time, the newest live reply or creation time replaces it
+    Thread = apps.get_model('threads', 'Thread')
+    Reply = apps.get_model('threads', 'Reply')
+    latest = (
+        Reply.objects
+        .filter(thread=models.OuterRef('pk'), is_deleted=False)
+        .order_by('-created_at')
+        .values('created_at')[:1]
+    )
+    last_pk = Thread.objects.aggregate(last=models.Max('pk'))['last'] or 0
+    for start in range(0, last_pk, 1000):
+        Thread.objects.filter(pk__gt=start, pk__lte=start + 1000).update(
+            last_activity_at=Coalesce(models.Subquery(latest), models.F('created_at'))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0017_outbound_mail_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Any
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from threads import stamps
+
+
+class ConditionalGetMixin:
+    """Answers GET with 304 while the view's stamp, user and query string are unchanged, without rendering"""
+
+    def get_stamp(self) -> float:
+        raise NotImplementedError
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if not stamps.shared():
+            # Without a shared cache no worker sees the others' stamps, so every request renders
+            response = super().get(request, *args, **kwargs) # type: ignore
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        stamp = self.get_stamp()
+        # The CSRF secret rotates on login, pages holding forms must not outlive it
+        identity = f'{stamp!r}:{request.user.pk}:{request.META.get("CSRF_COOKIE", "")}:{request.get_full_path()}'
+        etag = quote_etag(hashlib.sha256(identity.encode()).hexdigest()[:32])
+        last_modified = int(stamp)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs) # type: ignore
+            if response.status_code == 200:
+                response.headers.setdefault('ETag', etag)
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
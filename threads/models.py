@@ -1,13 +1,16 @@
-import bleach
-import markdown
-from django.db import models, transaction, IntegrityError
-from django.urls import reverse_lazy
+from collections import Counter
+from django.db import connection, models, transaction, IntegrityError
 from django.conf import settings
 from django.core import validators
-from django.utils import text
-from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import text, timezone
 from django.contrib.sites.models import Site
-from threads.utils import queue_mail, queue_mass_mail
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Coalesce, Greatest
+from threads import renderer, events, counters, stamps, caching, ranking
+from threads.mentions import parse_mentions
+from threads.search import get_search_backend, trigrams
 
 # Create your models here.
 
@@ -20,6 +23,8 @@ class Category(models.Model):
     name = models.CharField(verbose_name='name', max_length=255, unique=True)
     slug = models.SlugField(verbose_name='slug', unique=True, blank=True, editable=False)
 
+    LIST_KEY = 'threads:category_list'
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         update_fields = kwargs.get('update_fields')
@@ -55,82 +60,198 @@ class Tag(models.Model):
     name = models.CharField(verbose_name='name', max_length=255, unique=True)
     color = models.CharField(verbose_name='color', max_length=7, validators=[hex_validator])
 
+    CLOUD_KEY = 'threads:tag_cloud:{}'
+
+    @classmethod
+    def cloud(cls, category) -> list['Tag']:
+        # Tags used by live threads of the category, most used first, dropped by signals when tagging changes
+        def compute():
+            return list(
+                cls.objects.filter(tagged__category=category, tagged__is_deleted=False)
+                .annotate(threads=models.Count('tagged'))
+                .order_by('-threads', 'name')
+            )
+        return caching.get_or_compute(cls.CLOUD_KEY.format(category.pk), compute, settings.THREADS_TAG_CLOUD_TIMEOUT)
+
+    @classmethod
+    def invalidate_cloud(cls, category_ids) -> None:
+        cache.delete_many([cls.CLOUD_KEY.format(pk) for pk in set(category_ids)])
+
     def __str__(self) -> str:
         return str(self.name)
 
 
+class PostQuerySet(models.QuerySet):
+
+    def with_exact_counts(self):
+        # Adds deltas that have not been flushed yet, as `exact_<counter>`
+        return self.annotate(**{
+            f'exact_{field}': Greatest(models.F(field) + counters.pending(self.model, field), 0)
+            for field in self.model.COUNTER_FIELDS
+        })
+
+
+class ThreadQuerySet(PostQuerySet):
+
+    @transaction.atomic
+    def soft_delete(self) -> int:
+        pks = list(self.filter(is_deleted=False).values_list('pk', flat=True))
+        # updated_at lets the typeahead sync in other workers see the deletion
+        deleted = Thread.objects.filter(pk__in=pks, is_deleted=False).update(is_deleted=True, version=models.F('version') + 1, updated_at=timezone.now())
+        for pk in pks:
+            events.publish(events.ThreadDeleted(pk))
+        stamps.touch_threads(pks)
+        return deleted
+
+    def refresh_last_activity(self) -> int:
+        # Newest live reply, or the thread itself once it has none
+        latest = (
+            Reply.objects
+            .filter(thread=models.OuterRef('pk'), is_deleted=False)
+            .order_by('-created_at')
+            .values('created_at')[:1]
+        )
+        return self.update(last_activity_at=Coalesce(models.Subquery(latest), models.F('created_at')))
+
+    @transaction.atomic
+    def lock(self) -> int:
+        pks = list(self.filter(is_locked=False).values_list('pk', flat=True))
+        stamps.touch_threads(pks)
+        return Thread.objects.filter(pk__in=pks, is_locked=False).update(is_locked=True, version=models.F('version') + 1)
+
+    @transaction.atomic
+    def unlock(self) -> int:
+        pks = list(self.filter(is_locked=True).values_list('pk', flat=True))
+        stamps.touch_threads(pks)
+        return Thread.objects.filter(pk__in=pks, is_locked=True).update(is_locked=False, version=models.F('version') + 1)
+
+
+class ReplyQuerySet(PostQuerySet):
+
+    @transaction.atomic
+    def soft_delete(self) -> int:
+        # Locks only the replies being deleted, so every reply_count delta matches a flipped row
+        rows = list(self.filter(is_deleted=False).select_for_update(of=('self', )).values_list('pk', 'thread_id'))
+        Reply.objects.filter(pk__in=[pk for pk, _ in rows]).update(is_deleted=True, version=models.F('version') + 1)
+        removed = Counter(thread_id for _, thread_id in rows)
+        counters.add_many(Thread, 'reply_count', {thread_id: -count for thread_id, count in removed.items()})
+        Thread.objects.filter(pk__in=removed).refresh_last_activity()
+        for pk, thread_id in rows:
+            events.publish(events.ReplyEdited(pk, thread_id))
+        stamps.touch_threads(removed)
+        return len(rows)
+
+
 class Post(models.Model):
 
     class Meta:
         abstract = True
 
-    upvotes = models.ManyToManyField(verbose_name='upvotes', to=settings.AUTH_USER_MODEL, blank=True, related_name='upvoted_%(class)s')
+    COUNTER_FIELDS: tuple[str, ...] = ('upvote_count', )
+
+    objects = PostQuerySet.as_manager()
+
     upvote_count = models.PositiveIntegerField(verbose_name='upvote count', default=0)
     raw_content = models.TextField(verbose_name='raw_content')
+    rendered_content = models.TextField(verbose_name='rendered content', blank=True, editable=False)
+    content_hash = models.CharField(verbose_name='content hash', max_length=64, blank=True, editable=False)
+    renderer_hash = models.CharField(verbose_name='renderer hash', max_length=64, blank=True, editable=False)
     author = models.ForeignKey(verbose_name='author', to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='%(class)s')
     created_at = models.DateTimeField(verbose_name='created at', auto_now_add=True)
     is_deleted = models.BooleanField(verbose_name='is deleted', default=False)
+    version = models.PositiveIntegerField(verbose_name='version', default=1, editable=False)
 
     @property
     def content(self) -> str:
         if self.is_deleted:
             return '_[This content has been removed]_'
+        elif self.is_rendered:
+            return self.rendered_content
         else:
-            markdown_content = markdown.markdown(text=self.raw_content, extensions=['extra', 'nl2br', 'codehilite'])
-            allowed_tags = ['p', 'br', 'strong', 'em', 'u', 'blockquote', 'h1', 'h2', 'h3', 'ul', 'ol', 'li', 'code', 'pre', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'a']
-            allowed_attrs = {'a': ['href', 'title', 'target'], '*': ['class']}
-            allowed_protocols = ['http', 'https', 'mailto']
-            return bleach.clean(text=markdown_content, tags=allowed_tags, attributes=allowed_attrs, protocols=allowed_protocols)
+            return renderer.render(self.raw_content)
+
+    @property
+    def is_rendered(self) -> bool:
+        return self.renderer_hash == renderer.RENDERER_HASH and self.content_hash == renderer.content_hash(self.raw_content)
+
+    def render(self) -> bool:
+        if self.is_rendered:
+            return False
+        self.rendered_content = renderer.render(self.raw_content)
+        self.content_hash = renderer.content_hash(self.raw_content)
+        self.renderer_hash = renderer.RENDERER_HASH
+        return True
+
+    @classmethod
+    def upvoted_by(cls, user):
+        if not user.is_authenticated:
+            return models.Value(False, output_field=models.BooleanField())
+        return models.Exists(
+            cls.upvotes.through.objects.filter(user=user.pk, **{cls._meta.model_name: models.OuterRef('pk')}) # type: ignore
+        )
 
     @transaction.atomic
-    def update_upvotes(self, user) -> None:
-        obj = self.__class__.objects.select_for_update().get(pk=self.pk)
-        if obj.upvotes.filter(id=user.id).exists():
-            obj.upvotes.remove(user)
-            amount = -1
+    def update_upvotes(self, user) -> bool:
+        """Toggles the vote of `user`, the counter moves by the rows actually deleted or inserted"""
+        Vote = self.upvotes.through # type: ignore
+        name = self._meta.model_name
+        deleted, _ = Vote.objects.filter(user=user.pk, **{name: self.pk}).delete()
+        if deleted:
+            delta = -deleted
         else:
-            obj.upvotes.add(user)
-            amount = 1
-        obj.upvote_count = models.F('upvote_count') + amount
-        obj.save(update_fields=['upvote_count'])
+            table = connection.ops.quote_name(Vote._meta.db_table)
+            post_column = connection.ops.quote_name(Vote._meta.get_field(name).column)
+            user_column = connection.ops.quote_name(Vote._meta.get_field('user').column)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} ({post_column}, {user_column}) VALUES (%s, %s) ON CONFLICT DO NOTHING',
+                    [self.pk, user.pk]
+                )
+                delta = cursor.rowcount
+        if delta:
+            counters.add(self.__class__, self.pk, 'upvote_count', delta)
+            # The voter's upvoted state shows on the detail page, and for threads on the list card too
+            if isinstance(self, Thread):
+                stamps.touch([self.pk], [self.category_id])
+            else:
+                stamps.touch([self.thread_id])
+        return delta > 0
+
+    def soft_delete(self) -> None:
+        self.__class__.objects.filter(pk=self.pk).soft_delete()
+        self.is_deleted = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so an edit only resolves the mentions it added or removed
+        instance._loaded_raw_content = instance.__dict__.get('raw_content')
+        return instance
 
-    @transaction.atomic
-    def soft_delete(self):
-        obj = self.__class__.objects.select_for_update().get(pk=self.pk)
-        if not obj.is_deleted:
-            obj.is_deleted = True
-            obj.save(update_fields=['is_deleted'])
-
-    def _get_mentioned(self):
-        User = get_user_model()
-        excluded = '.,!?;:()[]{}\"\'/\\<>*&^%$#='
-        words = {i.strip(excluded) for i in self.raw_content.split()}
-        mentions = {i.lstrip('@') for i in words if i.startswith('@')}
-        mentioned_users = User.objects.filter(username__in=mentions).exclude(pk=self.author.pk)
-        return mentioned_users
-        
     def save(self, *args, **kwargs) -> None:
         is_new = self.pk is None
         update_fields = kwargs.get('update_fields')
+        if is_new or (update_fields is None) or (update_fields and 'raw_content' in update_fields):
+            if self.render() and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'rendered_content', 'content_hash', 'renderer_hash'}
+        if not is_new:
+            # Moves cached fragments of this post to a fresh key, incremented in SQL so concurrent edits never land on the same version
+            self.version = models.F('version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
         super().save(*args, **kwargs)
+        if isinstance(self.version, models.expressions.Combinable):
+            self.refresh_from_db(fields=['version'])
         if is_new or (update_fields is None) or (update_fields and 'raw_content' in update_fields):
-            if isinstance(self, Thread):
-                pk = self.pk
-            else:
-                pk = self.thread.pk # type: ignore
-            subject = f'You have been mentioned in a {self.__class__.__name__}'
-            link = f'https://forumdeck.sreyash.tech{str(reverse_lazy('threads:thread_detail', kwargs={'pk': pk, 'order_by': '-created_at'}))}'
-            body=f'Mentioned By: {self.author}\nMentioned At: {self.created_at}\nClick this link to view: {link}'
-            messages = []
-            for user in self._get_mentioned():
-                message = (
-                    subject,
-                    body,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [user.email]
-                )
-                messages.append(message)
-            queue_mass_mail(messages=tuple(messages))
+            previous = getattr(self, '_loaded_raw_content', None)
+            if previous != self.raw_content:
+                current, before = parse_mentions(self.raw_content), parse_mentions(previous)
+                thread_id, reply_id = (self.pk, None) if isinstance(self, Thread) else (self.thread_id, self.pk) # type: ignore
+                if current - before:
+                    events.publish(events.MentionAdded(thread_id, reply_id, self.author_id, tuple(sorted(current - before))))
+                if before - current:
+                    events.publish(events.MentionRemoved(thread_id, reply_id, tuple(sorted(before - current))))
+            self._loaded_raw_content = self.raw_content
 
 
 class Trigram(models.Model):
@@ -142,6 +263,13 @@ class Trigram(models.Model):
     value = models.CharField(verbose_name='value', max_length=3, db_index=True, unique=True)
 
 
+class ThreadManager(models.Manager.from_queryset(ThreadQuerySet)):
+
+    def get_queryset(self):
+        # The tsvector is only read inside the search backend's SQL, and left out of full saves that would write it back stale
+        return super().get_queryset().defer('search_vector')
+
+
 class Thread(Post):
 
     class Meta(Post.Meta):
@@ -149,7 +277,21 @@ class Thread(Post):
         verbose_name = 'Thread'
         verbose_name_plural = 'Threads'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['category', 'is_deleted', '-created_at', '-id'], name='thread_category_created_idx'),
+            models.Index(fields=['category', 'is_deleted', '-upvote_count', '-id'], name='thread_category_upvotes_idx'),
+            models.Index(fields=['category', 'is_deleted', '-last_activity_at', '-id'], name='thread_category_activity_idx'),
+            models.Index(fields=['category', 'is_deleted', '-hot_score', '-id'], name='thread_category_hot_idx'),
+            models.Index(fields=['updated_at', 'id'], name='thread_updated_idx'),
+            GinIndex(fields=['title'], name='thread_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['search_vector'], name='thread_search_vector_idx')
+        ]
     
+    COUNTER_FIELDS = ('upvote_count', 'reply_count')
+
+    objects = ThreadManager()
+
+    upvotes = models.ManyToManyField(verbose_name='upvotes', to=settings.AUTH_USER_MODEL, through='threads.ThreadVote', blank=True, related_name='upvoted_thread')
     category = models.ForeignKey(verbose_name='category', to='threads.Category', on_delete=models.CASCADE, related_name='threads')
     title = models.CharField(verbose_name='title', max_length=255)
     trigrams = models.ManyToManyField(verbose_name='trigrams', to='threads.Trigram', blank=True, related_name='threads')
@@ -158,45 +300,41 @@ class Thread(Post):
     tags = models.ManyToManyField(verbose_name='tags', to='threads.Tag', blank=True, related_name='tagged')
     is_locked = models.BooleanField(verbose_name='is locked', default=False)
     reply_count = models.PositiveIntegerField(verbose_name='reply_count', default=0)
+    last_activity_at = models.DateTimeField(verbose_name='last activity at', default=timezone.now)
+    hot_score = models.FloatField(verbose_name='hot score', default=0, editable=False)
+    updated_at = models.DateTimeField(verbose_name='updated at', auto_now=True)
+    search_vector = SearchVectorField(verbose_name='search vector', null=True, editable=False)
 
     @classmethod
     def fuzzy_search(cls, prompt: str):
-        prompt = f'  {prompt.lower()}  '
-        prompt_values = [prompt[i:i+3] for i in range(len(prompt) - 2)]
-        return cls.objects.filter(
-            trigrams__value__in=prompt_values
-        ).annotate(
-            score=models.Count('trigrams')
-        ).filter(
-            score__gte=2
-        ).order_by(
-            '-score'
-        )
+        return get_search_backend().search(cls.objects.all(), prompt)
 
-    @transaction.atomic
-    def update_lock(self):
-        obj = self.__class__.objects.select_for_update().get(pk=self.pk)
-        if obj.is_locked:
-            obj.is_locked = False
+    def update_lock(self) -> None:
+        threads = Thread.objects.filter(pk=self.pk)
+        if self.is_locked:
+            threads.unlock()
         else:
-            obj.is_locked = True
-        obj.save(update_fields=['is_locked'])
+            threads.lock()
+        self.is_locked = not self.is_locked
 
     @transaction.atomic
     def _save_trigrams(self) -> None:
         obj = self.__class__.objects.select_for_update().get(pk=self.pk)
-        title = f'  {obj.title.lower()}  '
-        values: set[str] = set([title[i:i+3] for i in range(len(title) - 2)])
+        values = trigrams(obj.title)
         Trigram.objects.bulk_create([Trigram(value=value) for value in values], ignore_conflicts=True)
-        trigrams = Trigram.objects.filter(value__in=values)
-        obj.trigrams.set(trigrams)
+        obj.trigrams.set(Trigram.objects.filter(value__in=values))
 
     def save(self, *args, **kwargs) -> None:
         is_new = self.pk is None
+        if is_new:
+            # Ranked right away, refresh_hot_scores only follows counter changes
+            self.hot_score = ranking.hot_score(self.upvote_count, self.reply_count, timezone.now())
         super().save(*args, **kwargs)
         update_fields = kwargs.get('update_fields')
-        if is_new or (update_fields is None) or (update_fields and 'title' in update_fields):
-            self._save_trigrams()
+        if is_new:
+            events.publish(events.ThreadCreated(self.pk, self.author_id))
+        elif (update_fields is None) or {'title', 'raw_content'} & set(update_fields):
+            events.publish(events.ThreadEdited(self.pk))
     
     def __str__(self) -> str:
         return f'Thread Title: {self.title}\nAuthor: {self.author}\nContent: {self.content}'
@@ -209,37 +347,87 @@ class Reply(Post):
         verbose_name = 'Reply'
         verbose_name_plural = 'Replies'
         ordering = ['thread', '-created_at']
+        indexes = [
+            models.Index(fields=['thread', 'is_deleted', '-created_at', '-id'], name='reply_thread_created_idx'),
+            models.Index(fields=['thread', 'is_deleted', '-upvote_count', '-id'], name='reply_thread_upvotes_idx')
+        ]
 
-    thread = models.ForeignKey(verbose_name='thread', to='threads.Thread', on_delete=models.CASCADE, related_name='replies')
+    objects = ReplyQuerySet.as_manager()
 
-    @transaction.atomic
-    def soft_delete(self) -> None:
-        thread = Thread.objects.select_for_update().get(pk=self.thread.pk)
-        obj = self.__class__.objects.select_for_update().get(pk=self.pk)
-        if not obj.is_deleted:
-            obj.is_deleted = True
-            thread.reply_count=models.F('reply_count') - 1
-            obj.save(update_fields=['is_deleted'])
-            thread.save(update_fields=['reply_count'])
+    upvotes = models.ManyToManyField(verbose_name='upvotes', to=settings.AUTH_USER_MODEL, through='threads.ReplyVote', blank=True, related_name='upvoted_reply')
+    thread = models.ForeignKey(verbose_name='thread', to='threads.Thread', on_delete=models.CASCADE, related_name='replies')
 
     def save(self, *args, **kwargs) -> None:
         is_new = self.pk is None
         super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
         if is_new:
-            Thread.objects.filter(pk=self.thread.pk).update(reply_count=models.F('reply_count') + 1)
-            subject = f'Your thread has gotten replies!'
-            link = f'https://forumdeck.sreyash.tech{str(reverse_lazy('threads:thread_detail', kwargs={'pk': self.thread.pk, 'order_by': '-created_at'}))}'
-            body = f'{self.author} has replied to your thread on {self.thread.category} at {self.created_at}\nView your thread: {link}'
-            queue_mail(
-                to=self.thread.author.email,
-                subject=subject,
-                body=body
-            )
+            counters.add(Thread, self.thread_id, 'reply_count', 1)
+            events.publish(events.ReplyCreated(self.pk, self.thread_id, self.author_id))
+        elif (update_fields is None) or 'raw_content' in update_fields:
+            events.publish(events.ReplyEdited(self.pk, self.thread_id))
 
     def __str__(self) -> str:
         return f'Reply to: {self.thread}\nAuthor: {self.author}\nContent: {self.content}'
 
 
+class ThreadVote(models.Model):
+
+    class Meta:
+        verbose_name = 'Thread Vote'
+        verbose_name_plural = 'Thread Votes'
+        # Reuses the table of the former auto-created M2M, including its unique (thread, user) index
+        db_table = 'threads_thread_upvotes'
+        unique_together = [('thread', 'user')]
+
+    thread = models.ForeignKey(verbose_name='thread', to='threads.Thread', on_delete=models.CASCADE)
+    user = models.ForeignKey(verbose_name='user', to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+
+class ReplyVote(models.Model):
+
+    class Meta:
+        verbose_name = 'Reply Vote'
+        verbose_name_plural = 'Reply Votes'
+        db_table = 'threads_reply_upvotes'
+        unique_together = [('reply', 'user')]
+
+    reply = models.ForeignKey(verbose_name='reply', to='threads.Reply', on_delete=models.CASCADE)
+    user = models.ForeignKey(verbose_name='user', to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+
+class CounterDelta(models.Model):
+
+    class Meta:
+        verbose_name = 'Counter Delta'
+        verbose_name_plural = 'Counter Deltas'
+        indexes = [
+            models.Index(fields=['target', 'object_id', 'field'], name='counter_delta_target_idx'),
+        ]
+
+    target = models.CharField(verbose_name='target', max_length=16)
+    object_id = models.PositiveBigIntegerField(verbose_name='object id')
+    field = models.CharField(verbose_name='field', max_length=32)
+    delta = models.IntegerField(verbose_name='delta')
+    created_at = models.DateTimeField(verbose_name='created at', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'{self.target} {self.object_id}: {self.field} {self.delta:+d}'
+
+
+class Checkpoint(models.Model):
+
+    class Meta:
+        verbose_name = 'Checkpoint'
+        verbose_name_plural = 'Checkpoints'
+
+    name = models.CharField(verbose_name='name', max_length=64, unique=True)
+    position = models.DateTimeField(verbose_name='position')
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.position}'
+
+
 class Report(models.Model):
 
     class Meta:
@@ -268,3 +456,77 @@ class Report(models.Model):
 
     def __str__(self) -> str:
         return f'Report By: {self.reporter}\nReport On: {self.thread if self.thread else self.reply}\nReason: {self.reason}\nStatus: {self.status}'
+
+
+class Mention(models.Model):
+
+    class Meta:
+        verbose_name = 'Mention'
+        verbose_name_plural = 'Mentions'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'thread'], condition=models.Q(reply__isnull=True), name='mention_unique_thread'),
+            models.UniqueConstraint(fields=['user', 'reply'], condition=models.Q(reply__isnull=False), name='mention_unique_reply'),
+        ]
+
+    user = models.ForeignKey(verbose_name='user', to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mentions')
+    thread = models.ForeignKey(verbose_name='thread', to='threads.Thread', on_delete=models.CASCADE, related_name='mentions')
+    reply = models.ForeignKey(verbose_name='reply', to='threads.Reply', on_delete=models.CASCADE, related_name='mentions', blank=True, null=True)
+    created_at = models.DateTimeField(verbose_name='created at', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'Mentioned: {self.user}\nThread: {self.thread}'
+
+
+class Notification(models.Model):
+
+    class Meta:
+        verbose_name = 'Notification'
+        verbose_name_plural = 'Notifications'
+        indexes = [
+            models.Index(fields=['recipient', 'digested_at', 'created_at'], name='notification_pending_idx'),
+        ]
+
+    class KindChoices(models.TextChoices):
+        REPLY = 'REPLY', 'Reply'
+        MENTION = 'MENTION', 'Mention'
+
+    recipient = models.ForeignKey(verbose_name='recipient', to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    actor = models.ForeignKey(verbose_name='actor', to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(verbose_name='kind', choices=KindChoices.choices, max_length=7)
+    thread = models.ForeignKey(verbose_name='thread', to='threads.Thread', on_delete=models.CASCADE, related_name='notifications')
+    reply = models.ForeignKey(verbose_name='reply', to='threads.Reply', on_delete=models.CASCADE, related_name='notifications', blank=True, null=True)
+    created_at = models.DateTimeField(verbose_name='created at', auto_now_add=True)
+    digested_at = models.DateTimeField(verbose_name='digested at', blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f'To: {self.recipient}\nKind: {self.kind}\nThread: {self.thread}'
+
+
+class OutboundMail(models.Model):
+
+    class Meta:
+        verbose_name = 'Outbound Mail'
+        verbose_name_plural = 'Outbound Mail'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_mail_due_idx'),
+        ]
+
+    class StatusChoices(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        FAILED = 'FAILED', 'Failed'
+
+    dedupe_key = models.CharField(verbose_name='dedupe key', max_length=64, unique=True, blank=True, null=True)
+    recipient = models.EmailField(verbose_name='recipient')
+    from_email = models.CharField(verbose_name='from email', max_length=255)
+    subject = models.CharField(verbose_name='subject', max_length=255)
+    body = models.TextField(verbose_name='body')
+    status = models.CharField(verbose_name='status', choices=StatusChoices.choices, max_length=7, default=StatusChoices.PENDING)
+    attempts = models.PositiveSmallIntegerField(verbose_name='attempts', default=0)
+    next_attempt_at = models.DateTimeField(verbose_name='next attempt at', default=timezone.now)
+    last_error = models.TextField(verbose_name='last error', blank=True)
+    created_at = models.DateTimeField(verbose_name='created at', auto_now_add=True)
+    sent_at = models.DateTimeField(verbose_name='sent at', blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f'To: {self.recipient}\nSubject: {self.subject}\nStatus: {self.status}'
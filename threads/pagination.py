@@ -0,0 +1,110 @@
+import json
+import base64
+import binascii
+import datetime
+from functools import reduce
+from operator import or_
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+
+    def default(self, o):
+        # DjangoJSONEncoder truncates to milliseconds, which would skip rows on a page boundary
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+
+    def __init__(self, object_list: list, next_cursor: str | None, previous_cursor: str | None) -> None:
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+
+    def __init__(self, queryset, ordering: tuple[str, ...], per_page: int) -> None:
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in ordering]
+
+    def page(self, after: str | None = None, before: str | None = None) -> KeysetPage:
+        if before:
+            qs = self.queryset.filter(self._seek(self.decode(before), forward=False))
+            qs = qs.order_by(*[name if descending else f'-{name}' for name, descending in self.keys])
+            rows = list(qs[:self.per_page + 1])
+            more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            previous_cursor = self.encode(rows[0]) if more and rows else None
+            next_cursor = self.encode(rows[-1]) if rows else None
+            return KeysetPage(rows, next_cursor, previous_cursor)
+        qs = self.queryset
+        if after:
+            qs = qs.filter(self._seek(self.decode(after), forward=True))
+        rows = list(qs.order_by(*self.ordering)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = self.encode(rows[-1]) if more else None
+        previous_cursor = self.encode(rows[0]) if after and rows else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def encode(self, obj) -> str:
+        values = [getattr(obj, 'pk' if name in ('pk', 'id') else name) for name, _ in self.keys]
+        data = json.dumps(values, cls=CursorEncoder, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode(self, cursor: str) -> list:
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(data)
+        except (binascii.Error, ValueError):
+            raise InvalidCursor(cursor)
+        # Null or nested values would reach the seek filter as `__lt=None` and fail there instead of here
+        if not isinstance(values, list) or len(values) != len(self.keys) or not all(isinstance(value, (str, int, float)) for value in values):
+            raise InvalidCursor(cursor)
+        opts = self.queryset.model._meta
+        try:
+            return [
+                opts.pk.to_python(value) if name in ('pk', 'id') else opts.get_field(name).to_python(value)
+                for (name, _), value in zip(self.keys, values)
+            ]
+        except (ValidationError, TypeError):
+            # A datetime key fed a number raises TypeError from fromisoformat
+            raise InvalidCursor(cursor)
+
+    def _seek(self, values: list, forward: bool) -> Q:
+        conditions = []
+        for i, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition = Q(**{f'{name}__{lookup}': values[i]})
+            for j, (prev_name, _) in enumerate(self.keys[:i]):
+                condition &= Q(**{prev_name: values[j]})
+            conditions.append(condition)
+        return reduce(or_, conditions)
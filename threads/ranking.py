@@ -0,0 +1,68 @@
+import math
+from datetime import datetime, timedelta
+from django.apps import apps
+from django.db import connection, transaction
+from django.utils import timezone
+from threads import stamps
+
+# Reddit's epoch and gravity, 12.5 hours of age weigh as much as a tenfold score.
+# Age only enters as the creation time, so a score never decays and only changes with the counters.
+EPOCH = 1134028003
+GRAVITY = 45000
+REPLY_WEIGHT = 0.5
+CHECKPOINT = 'hot_scores'
+
+
+def hot_score(upvotes: int, replies: int, created_at: datetime) -> float:
+    points = upvotes + REPLY_WEIGHT * replies
+    return round(math.log10(max(points, 1)) + (created_at.timestamp() - EPOCH) / GRAVITY, 7)
+
+
+def refresh(batch_size: int = 1000, overlap: int = 300, full: bool = False) -> int:
+    """
+    Re-scores threads whose `updated_at` moved since the last run, returns the threads rescored.
+
+    The high-water mark is the start of the previous run, rows are re-read `overlap` seconds before it
+    so transactions that committed late, or clocks that lag, are not skipped.
+    """
+    Thread = apps.get_model('threads', 'Thread')
+    Checkpoint = apps.get_model('threads', 'Checkpoint')
+    started = timezone.now()
+    checkpoint = Checkpoint.objects.filter(name=CHECKPOINT).first()
+    threads = Thread.objects.filter(updated_at__lt=started)
+    if checkpoint and not full:
+        threads = threads.filter(updated_at__gte=checkpoint.position - timedelta(seconds=overlap))
+    # One index-only scan over (updated_at, id), then batches by primary key
+    pks = list(threads.order_by('pk').values_list('pk', flat=True))
+    rescored = 0
+    for offset in range(0, len(pks), batch_size):
+        batch = Thread.objects.filter(pk__in=pks[offset:offset + batch_size]).order_by().only('pk', 'category_id', 'upvote_count', 'reply_count', 'created_at', 'hot_score')
+        changed = []
+        for thread in batch:
+            score = hot_score(thread.upvote_count, thread.reply_count, thread.created_at)
+            if score != thread.hot_score:
+                thread.hot_score = score
+                changed.append(thread)
+        if changed:
+            with transaction.atomic():
+                _store(Thread, changed)
+                stamps.touch(categories={thread.category_id for thread in changed})
+            rescored += len(changed)
+    Checkpoint.objects.update_or_create(name=CHECKPOINT, defaults={'position': started})
+    return rescored
+
+
+def _store(model, threads: list) -> None:
+    # bulk_update's CASE grows with the batch, one UPDATE ... FROM (VALUES ...) does not
+    if connection.vendor != 'postgresql':
+        model.objects.bulk_update(threads, ['hot_score'])
+        return
+    quote = connection.ops.quote_name
+    column = quote(model._meta.get_field('hot_score').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote(model._meta.db_table)} AS t SET {column} = v.score '
+            f'FROM (VALUES {", ".join(["(%s::bigint, %s::double precision)"] * len(threads))}) AS v(id, score) '
+            f'WHERE t.{quote(model._meta.pk.column)} = v.id',
+            [value for thread in threads for value in (thread.pk, thread.hot_score)]
+        )
@@ -0,0 +1,137 @@
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+import bleach
+import markdown
+import pygments
+from bleach.sanitizer import Cleaner
+from django.conf import settings
+from django.core.cache import caches
+
+MARKDOWN_EXTENSIONS = ['extra', 'nl2br', 'codehilite']
+ALLOWED_TAGS = ['p', 'br', 'strong', 'em', 'u', 'blockquote', 'h1', 'h2', 'h3', 'ul', 'ol', 'li', 'code', 'pre', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'a']
+ALLOWED_ATTRIBUTES = {'a': ['href', 'title', 'target'], '*': ['class']}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+RENDERER_HASH = hashlib.sha256(
+    repr((markdown.__version__, bleach.__version__, pygments.__version__, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, sorted(ALLOWED_ATTRIBUTES.items()), ALLOWED_PROTOCOLS)).encode()
+).hexdigest()
+
+_local = threading.local()
+
+
+def _get_renderer() -> tuple[markdown.Markdown, Cleaner]:
+    # Markdown instances keep per-document state, so each thread gets its own pair
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = (
+            markdown.Markdown(extensions=MARKDOWN_EXTENSIONS),
+            Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, protocols=ALLOWED_PROTOCOLS)
+        )
+        _local.renderer = renderer
+    return renderer
+
+
+def content_hash(raw_content: str) -> str:
+    return hashlib.sha256(raw_content.encode()).hexdigest()
+
+
+class RenderCache:
+
+    def __init__(self, max_bytes: int, alias: str | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.alias = alias
+        self.size = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.alias:
+            value = caches[self.alias].get(f'markdown:{key}')
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self._store(key, value)
+        if self.alias:
+            caches[self.alias].set(f'markdown:{key}', value)
+
+    def _store(self, key: str, value: str) -> None:
+        cost = sys.getsizeof(key) + sys.getsizeof(value)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= sys.getsizeof(key) + sys.getsizeof(previous)
+            self._entries[key] = value
+            self.size += cost
+            while self.size > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self.size -= sys.getsizeof(old_key) + sys.getsizeof(old_value)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict[str, int | str | None]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'alias': self.alias
+            }
+
+
+render_cache = RenderCache(
+    max_bytes=settings.RENDER_CACHE_MAX_BYTES,
+    alias=settings.RENDER_CACHE_ALIAS
+)
+
+
+def convert(raw_content: str) -> str:
+    md, cleaner = _get_renderer()
+    try:
+        return cleaner.clean(md.convert(raw_content))
+    finally:
+        md.reset()
+
+
+def render(raw_content: str) -> str:
+    key = f'{RENDERER_HASH[:16]}:{content_hash(raw_content)}'
+    html = render_cache.get(key)
+    if html is None:
+        html = convert(raw_content)
+        render_cache.set(key, html)
+    return html
+
+
+def render_many(posts):
+    posts = [post for post in posts if post is not None]
+    for post in posts:
+        if not post.is_deleted:
+            post.render()
+    return posts
@@ -0,0 +1,225 @@
+import time
+import threading
+from datetime import timedelta
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from functools import cache
+from heapq import nlargest
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, OuterRef, Q, StringAgg, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Left
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+def trigrams(value: str) -> set[str]:
+    value = f'  {value.lower()}  '
+    return {value[i:i+3] for i in range(len(value) - 2)}
+
+
+class TrigramTableBackend:
+    # Matches through the Thread.trigrams join table; portable, so it is the fallback for SQLite runs
+    uses_trigram_table = True
+
+    def search(self, queryset, prompt: str):
+        return queryset.filter(
+            trigrams__value__in=trigrams(prompt)
+        ).annotate(
+            score=Count('trigrams')
+        ).filter(
+            score__gte=2
+        ).order_by(
+            '-score'
+        )
+
+    def admin_search(self, queryset, prompt: str):
+        return None
+
+    def index(self, thread) -> None:
+        thread._save_trigrams()
+
+    def index_replies(self, thread_pk: int) -> None:
+        pass
+
+
+class PostgresSearchBackend:
+    # Full-text search over the weighted Thread.search_vector plus pg_trgm similarity on titles for typos
+    uses_trigram_table = False
+
+    def search(self, queryset, prompt: str):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+        query = SearchQuery(prompt, search_type='websearch')
+        return queryset.filter(
+            Q(search_vector=query) | Q(title__trigram_similar=prompt)
+        ).annotate(
+            # Threads not indexed yet have no vector, a NULL rank would sort them above every match
+            score=Coalesce(SearchRank('search_vector', query), 0.0) + TrigramSimilarity('title', prompt)
+        ).order_by(
+            '-score'
+        )
+
+    def admin_search(self, queryset, prompt: str):
+        from django.contrib.postgres.search import SearchQuery
+        return queryset.filter(Q(search_vector=SearchQuery(prompt, search_type='websearch')) | Q(author__username__iexact=prompt))
+
+    def index(self, thread) -> None:
+        self.index_replies(thread.pk)
+
+    def index_replies(self, thread_pk: int) -> None:
+        from django.contrib.postgres.search import SearchVector
+        Thread = apps.get_model('threads', 'Thread')
+        Reply = apps.get_model('threads', 'Reply')
+        # Only the newest replies, clipped to a character budget, so a reply costs the same on busy threads
+        # and the vector stays far below PostgreSQL's 1 MB tsvector limit
+        newest = Reply.objects.filter(
+            thread=thread_pk, is_deleted=False
+        ).order_by('-created_at', '-id').values('pk')[:settings.THREADS_SEARCH_REPLY_LIMIT]
+        replies = Reply.objects.filter(
+            pk__in=Subquery(newest)
+        ).order_by().values('thread').annotate(
+            text=StringAgg('raw_content', delimiter=Value(' '))
+        ).values('text')
+        Thread.objects.filter(pk=thread_pk).update(
+            search_vector=(
+                SearchVector('title', weight='A')
+                + SearchVector('raw_content', weight='B')
+                + SearchVector(Left(Coalesce(Subquery(replies), Value(''), output_field=TextField()), settings.THREADS_SEARCH_REPLY_CHARS), weight='C')
+            )
+        )
+
+@cache
+def get_search_backend():
+    if settings.THREADS_SEARCH_BACKEND:
+        return import_string(settings.THREADS_SEARCH_BACKEND)()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return TrigramTableBackend()
+
+
+class TrigramIndex:
+    # In-process inverted index: category id -> trigram -> sorted array('I') of thread ids
+    # Seconds re-read before the sync mark, for transactions that committed late
+    SYNC_OVERLAP = 60
+
+    def __init__(self, sync_interval: float) -> None:
+        self.sync_interval = sync_interval
+        self.ready = False
+        self._postings: dict[int, dict[str, array]] = {}
+        self._titles: dict[int, tuple[int, str]] = {}
+        self._mark = None
+        self._last_sync = 0.0
+        self._lock = threading.RLock()
+        self._building = False
+        self._syncing = False
+
+    def warm(self) -> None:
+        with self._lock:
+            if self.ready or self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.build, daemon=True, name='trigram-index').start()
+
+    def build(self) -> None:
+        Thread = apps.get_model('threads', 'Thread')
+        postings: dict[int, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+        titles = {}
+        started = timezone.now()
+        try:
+            rows = Thread.objects.filter(is_deleted=False).order_by('pk').values_list('pk', 'category_id', 'title')
+            for pk, category_id, title in rows.iterator(chunk_size=5000):
+                titles[pk] = (category_id, title)
+                for value in trigrams(title):
+                    postings[category_id][value].append(pk)
+        finally:
+            connection.close()
+        with self._lock:
+            self._postings = {
+                category_id: {value: array('I', pks) for value, pks in category.items()}
+                for category_id, category in postings.items()
+            }
+            self._titles = titles
+            self._mark = started
+            self._last_sync = time.monotonic()
+            self._building = False
+            self.ready = True
+
+    def sync(self) -> None:
+        """Re-reads threads modified since the last sync, so edits and soft deletes from other workers land here too"""
+        with self._lock:
+            if self._syncing or self._mark is None:
+                return
+            self._syncing = True
+            since = self._mark - timedelta(seconds=self.SYNC_OVERLAP)
+        Thread = apps.get_model('threads', 'Thread')
+        started = timezone.now()
+        try:
+            rows = list(Thread.objects.filter(updated_at__gte=since).values_list('pk', 'category_id', 'title', 'is_deleted'))
+            with self._lock:
+                for pk, category_id, title, is_deleted in rows:
+                    if is_deleted:
+                        self.remove(pk)
+                    elif self._titles.get(pk) != (category_id, title):
+                        self.add(pk, category_id, title)
+                self._mark = started
+        finally:
+            with self._lock:
+                self._last_sync = time.monotonic()
+                self._syncing = False
+
+    def _sync_in_background(self) -> None:
+        try:
+            self.sync()
+        finally:
+            connection.close()
+
+    def add(self, pk: int, category_id: int, title: str) -> None:
+        with self._lock:
+            self.remove(pk)
+            category = self._postings.setdefault(category_id, {})
+            for value in trigrams(title):
+                insort(category.setdefault(value, array('I')), pk)
+            self._titles[pk] = (category_id, title)
+
+    def remove(self, pk: int) -> None:
+        with self._lock:
+            entry = self._titles.pop(pk, None)
+            if entry is None:
+                return
+            category_id, title = entry
+            category = self._postings.get(category_id, {})
+            for value in trigrams(title):
+                pks = category.get(value)
+                if pks is None:
+                    continue
+                i = bisect_left(pks, pk)
+                if i < len(pks) and pks[i] == pk:
+                    del pks[i]
+                if not pks:
+                    del category[value]
+
+    def search(self, category_id: int, prompt: str, limit: int) -> list[tuple[int, str, int]]:
+        if time.monotonic() - self._last_sync > self.sync_interval and not self._syncing:
+            threading.Thread(target=self._sync_in_background, daemon=True, name='trigram-sync').start()
+        scores: Counter[int] = Counter()
+        with self._lock:
+            category = self._postings.get(category_id, {})
+            for value in trigrams(prompt):
+                scores.update(category.get(value, ()))
+            best = nlargest(limit, ((score, pk) for pk, score in scores.items() if score >= 2))
+            return [(pk, self._titles[pk][1], score) for score, pk in best]
+
+    def stats(self) -> dict[str, int | bool]:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'threads': len(self._titles),
+                'categories': len(self._postings),
+                'trigrams': sum(len(category) for category in self._postings.values()),
+                'postings': sum(len(pks) for category in self._postings.values() for pks in category.values())
+            }
+
+
+trigram_index = TrigramIndex(sync_interval=settings.THREADS_TYPEAHEAD_SYNC_INTERVAL)
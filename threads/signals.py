@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.db.models import F
+from django.dispatch import receiver
+from courses.models import Course, Resource
+from threads import stamps
+from threads.models import Category, Reply, Tag, Thread
+from threads.mentions import forget_username
+from threads.search import trigram_index
+
+
+@receiver(post_save, sender=Thread)
+def index_thread(sender, instance, update_fields=None, **kwargs):
+    if not (settings.THREADS_TYPEAHEAD_INDEX and trigram_index.ready):
+        return
+    if update_fields is not None and not {'title', 'category', 'is_deleted'} & set(update_fields):
+        return
+    if instance.is_deleted:
+        trigram_index.remove(instance.pk)
+    else:
+        trigram_index.add(instance.pk, instance.category_id, instance.title)
+
+
+@receiver(post_delete, sender=Thread)
+def unindex_thread(sender, instance, **kwargs):
+    if settings.THREADS_TYPEAHEAD_INDEX and trigram_index.ready:
+        trigram_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_mentioned_user(sender, instance, **kwargs):
+    forget_username(instance.username)
+
+
+@receiver(post_save, sender=get_user_model())
+def touch_authored_pages(sender, instance, created, update_fields=None, **kwargs):
+    # Thread cards render author names and avatars live, reply blocks cache them under the reply's version,
+    # and 304s would still serve the old page
+    if created or (update_fields is not None and not {'username', 'full_name', 'avatar'} & set(update_fields)):
+        return
+    replies = Reply.objects.filter(author=instance)
+    pks = set(Thread.objects.filter(author=instance).values_list('pk', flat=True))
+    pks |= set(replies.values_list('thread_id', flat=True))
+    replies.update(version=F('version') + 1)
+    stamps.touch_threads(pks)
+
+
+@receiver(m2m_changed, sender=Thread.tags.through)
+def invalidate_tag_cloud(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        Tag.invalidate_cloud([instance.category_id])
+    elif action == 'pre_clear':
+        Tag.invalidate_cloud(instance.tagged.values_list('category_id', flat=True))
+    elif pk_set:
+        Tag.invalidate_cloud(Thread.objects.filter(pk__in=pk_set).values_list('category_id', flat=True))
+
+
+@receiver(post_save, sender=Thread)
+def invalidate_thread_tag_cloud(sender, instance, created, update_fields=None, **kwargs):
+    # New threads are untagged until their m2m is set, only visibility and category moves matter here
+    if not created and (update_fields is None or {'is_deleted', 'category'} & set(update_fields)):
+        Tag.invalidate_cloud([instance.category_id])
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_all_tag_clouds(sender, instance, **kwargs):
+    Tag.invalidate_cloud(Category.objects.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Thread.tags.through)
+@receiver(m2m_changed, sender=Thread.tagged_courses.through)
+@receiver(m2m_changed, sender=Thread.tagged_documents.through)
+def bump_thread_version(sender, instance, action, reverse, pk_set, **kwargs):
+    # Thread cards render their tags, courses and documents
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Thread.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+    elif pk_set:
+        Thread.objects.filter(pk__in=pk_set).update(version=F('version') + 1)
+
+
+@receiver([post_save, post_delete], sender=Thread)
+def touch_thread(sender, instance, **kwargs):
+    stamps.touch([instance.pk], [instance.category_id])
+
+
+@receiver([post_save, post_delete], sender=Reply)
+def touch_reply_thread(sender, instance, **kwargs):
+    # Replies move the thread in the recently active list
+    stamps.touch_threads([instance.thread_id])
+
+
+@receiver(m2m_changed, sender=Thread.tags.through)
+@receiver(m2m_changed, sender=Thread.tagged_courses.through)
+@receiver(m2m_changed, sender=Thread.tagged_documents.through)
+def touch_tagged_threads(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        stamps.touch([instance.pk], [instance.category_id])
+    elif pk_set:
+        stamps.touch_threads(pk_set)
+
+
+@receiver([post_save, pre_delete], sender=Tag)
+def touch_tag_pages(sender, instance, **kwargs):
+    # Every tag cloud may list the tag
+    stamps.touch(categories=Category.objects.values_list('pk', flat=True))
+
+
+@receiver([post_save, pre_delete], sender=Tag)
+@receiver([post_save, pre_delete], sender=Course)
+@receiver([post_save, pre_delete], sender=Resource)
+def bump_attached_threads(sender, instance, **kwargs):
+    # Cached thread cards render tag names and colors, course codes and document titles
+    # Deletes cascade through the m2m tables without m2m_changed, so they are caught before they happen
+    pks = list(instance.tagged.values_list('pk', flat=True))
+    if pks:
+        Thread.objects.filter(pk__in=pks).update(version=F('version') + 1)
+        stamps.touch_threads(pks)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_list(sender, instance, **kwargs):
+    cache.delete(Category.LIST_KEY)
+    stamps.touch(categories=[instance.pk])
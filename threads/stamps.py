@@ -0,0 +1,45 @@
+import time
+from django.apps import apps
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+KEY = 'threads:stamp:{}:{}'
+
+
+def _keys(threads=(), categories=()) -> list[str]:
+    return [KEY.format('thread', pk) for pk in threads] + [KEY.format('category', pk) for pk in categories]
+
+
+def touch(threads=(), categories=()) -> None:
+    """Moves the stamps forward once the caller's transaction commits, so no page renders old rows under a new stamp"""
+    keys = _keys(threads, categories)
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time()), None))
+
+
+def touch_threads(pks) -> None:
+    """Touches the threads and the categories listing them"""
+    Thread = apps.get_model('threads', 'Thread')
+    pks = set(pks)
+    if pks:
+        touch(pks, set(Thread.objects.filter(pk__in=pks).values_list('category_id', flat=True)))
+
+
+def shared() -> bool:
+    """Whether every worker reads the same stamps, per-process caches let workers answer 304 for pages another one changed"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get(threads=(), categories=()) -> float:
+    """Latest stamp across the given threads and categories, evicted stamps restart at now"""
+    keys = _keys(threads, categories)
+    stamps = cache.get_many(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        stamps.update(cache.get_many(missing))
+    return max(stamps.values(), default=0.0)
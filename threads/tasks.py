@@ -0,0 +1,105 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from typing import Any, Callable
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class TaskExecutor:
+    # Bounded pool for post-commit side effects, callers run the task themselves once the queue is full
+
+    def __init__(self, max_workers: int, max_queue: int, submit_timeout: float) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.submit_timeout = submit_timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='threads-task')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._inline = 0
+        self._waits: deque[float] = deque(maxlen=1024)
+        self._runtimes: deque[float] = deque(maxlen=1024)
+        self._shutdown = False
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> None:
+        if self._shutdown or not self._slots.acquire(timeout=self.submit_timeout):
+            with self._lock:
+                self._inline += 1
+            self._call(fn, args, kwargs, time.perf_counter(), pooled=False)
+            return
+        with self._lock:
+            self._pending += 1
+            self._submitted += 1
+        self._executor.submit(self._call, fn, args, kwargs, time.perf_counter(), pooled=True)
+
+    def _call(self, fn: Callable, args: tuple, kwargs: dict, queued_at: float, pooled: bool) -> None:
+        started = time.perf_counter()
+        failed = False
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            logger.exception('Task %s failed', getattr(fn, '__qualname__', fn))
+        finally:
+            if pooled:
+                connection.close()
+                self._slots.release()
+            finished = time.perf_counter()
+            with self._lock:
+                if pooled:
+                    self._pending -= 1
+                    self._waits.append(started - queued_at)
+                self._runtimes.append(finished - started)
+                self._completed += 1
+                self._failed += failed
+
+    def shutdown(self) -> None:
+        self._shutdown = True
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'queue_size': self.max_queue,
+                'queue_depth': self._pending,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'ran_inline': self._inline,
+                'wait_p95_ms': self._p95(self._waits),
+                'runtime_p95_ms': self._p95(self._runtimes)
+            }
+
+    @staticmethod
+    def _p95(samples: deque[float]) -> float:
+        if len(samples) < 2:
+            return round(samples[0] * 1000, 2) if samples else 0.0
+        return round(quantiles(samples, n=20)[-1] * 1000, 2)
+
+
+executor = TaskExecutor(
+    max_workers=settings.THREADS_TASK_WORKERS,
+    max_queue=settings.THREADS_TASK_QUEUE_SIZE,
+    submit_timeout=settings.THREADS_TASK_SUBMIT_TIMEOUT
+)
+atexit.register(executor.shutdown)
+
+
+def run(fn: Callable, *args: Any, **kwargs: Any) -> None:
+    """Runs `fn` on the task pool right away, or in the calling thread when eager"""
+    if settings.THREADS_TASK_EAGER:
+        fn(*args, **kwargs)
+    else:
+        executor.submit(fn, *args, **kwargs)
+
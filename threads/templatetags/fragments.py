@@ -0,0 +1,100 @@
+import threading
+from collections import Counter, defaultdict
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+PLACEHOLDER = '\x00live:{}\x00'
+
+
+class FragmentStats:
+
+    def __init__(self) -> None:
+        self._counts: defaultdict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, hit: bool) -> None:
+        with self._lock:
+            self._counts[name]['hits' if hit else 'misses'] += 1
+
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        with self._lock:
+            return {
+                name: {
+                    'hits': counts['hits'],
+                    'misses': counts['misses'],
+                    'hit_rate': round(counts['hits'] / max(counts['hits'] + counts['misses'], 1), 4)
+                }
+                for name, counts in self._counts.items()
+            }
+
+
+fragment_stats = FragmentStats()
+
+
+class LiveNode(template.Node):
+
+    def __init__(self, nodelist) -> None:
+        self.nodelist = nodelist
+
+    def render(self, context) -> str:
+        live = context.render_context.get(FragmentNode)
+        if live is None:
+            return self.nodelist.render(context)
+        live.append(self)
+        return PLACEHOLDER.format(len(live) - 1)
+
+
+class FragmentNode(template.Node):
+
+    def __init__(self, name: str, vary_on: list, nodelist) -> None:
+        self.name = name
+        self.vary_on = vary_on
+        self.nodelist = nodelist
+
+    def render(self, context) -> str:
+        vary = ':'.join(str(var.resolve(context)) for var in self.vary_on)
+        key = f'fragment:{settings.THREADS_FRAGMENT_VERSION}:{self.name}:{vary}'
+        cache = caches[settings.THREADS_FRAGMENT_CACHE_ALIAS]
+        cached = cache.get(key)
+        fragment_stats.record(self.name, cached is not None)
+        if cached is None:
+            live = []
+            with context.render_context.push():
+                context.render_context[FragmentNode] = live
+                html = self.nodelist.render(context)
+            cached = (html, [self.live_nodes.index(node) for node in live])
+            cache.set(key, cached, settings.THREADS_FRAGMENT_TIMEOUT)
+        html, order = cached
+        for i, index in enumerate(order):
+            html = html.replace(PLACEHOLDER.format(i), self.live_nodes[index].nodelist.render(context), 1)
+        return mark_safe(html)
+
+    @property
+    def live_nodes(self) -> list[LiveNode]:
+        return self.nodelist.get_nodes_by_type(LiveNode)
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Caches the enclosed block under a name and the values it varies on, e.g.
+    {% fragment 'reply' reply.pk reply.version %}. Nested {% live %} blocks stay
+    uncached and are rendered on every request, for per-user or time based bits.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a name and at least one value to vary on")
+    nodelist = parser.parse(('endfragment', ))
+    parser.delete_first_token()
+    return FragmentNode(bits[1].strip('\'"'), [parser.compile_filter(bit) for bit in bits[2:]], nodelist)
+
+
+@register.tag
+def live(parser, token):
+    nodelist = parser.parse(('endlive', ))
+    parser.delete_first_token()
+    return LiveNode(nodelist)
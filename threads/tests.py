@@ -1,3 +1,456 @@
-from django.test import TestCase
+import sys
+import base64
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from threads import counters, events, handlers, renderer
+from threads.models import Category, CounterDelta, Notification, OutboundMail, Reply, ReplyVote, Tag, Thread, ThreadVote
+from threads.renderer import RenderCache
+from threads.search import TrigramIndex
+from threads.utils import queue_mail, send_queued_mail
 
 # Create your tests here.
+
+User = get_user_model()
+
+
+class ThreadPageTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', email='reader@example.com', password='password')
+        cls.author = User.objects.create_user(username='author', email='author@example.com', password='password')
+        cls.category = Category.objects.create(name='General')
+        cls.thread = Thread.objects.create(title='First thread', raw_content='Hello', author=cls.author, category=cls.category)
+
+    def setUp(self):
+        # Tag clouds, counts and fragments are cached, every request starts cold
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def add_threads(self, count: int) -> None:
+        for i in range(count):
+            thread = Thread.objects.create(title=f'Thread {i}', raw_content='Hello', author=self.author, category=self.category)
+            thread.update_upvotes(self.user)
+
+    def add_replies(self, count: int) -> None:
+        for i in range(count):
+            reply = Reply.objects.create(thread=self.thread, raw_content=f'Reply {i}', author=self.author)
+            reply.update_upvotes(self.user)
+
+    def count_queries(self, url: str) -> int:
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueryBudget(self, url: str, budget: int) -> None:
+        # Counts the whole request, template rendering included, against the page's declared budget
+        count = self.count_queries(url)
+        self.assertLessEqual(count, budget, f'{url} ran {count} queries, over its budget of {budget}')
+
+    @property
+    def list_url(self) -> str:
+        return reverse('threads:thread_list', kwargs={'slug': self.category.slug, 'order_by': '-created_at'})
+
+    @property
+    def detail_url(self) -> str:
+        return reverse('threads:thread_detail', kwargs={'pk': self.thread.pk, 'order_by': '-created_at'})
+
+
+class ConstantQueryCountTests(ThreadPageTestCase):
+
+    def test_thread_list_does_not_grow_with_threads(self):
+        self.add_threads(4)
+        expected = self.count_queries(self.list_url)
+        self.add_threads(4)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.client.get(self.list_url)
+
+    def test_thread_detail_does_not_grow_with_replies(self):
+        self.add_replies(5)
+        expected = self.count_queries(self.detail_url)
+        self.add_replies(5)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.client.get(self.detail_url)
+
+
+class QueryBudgetTests(ThreadPageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_threads(12)
+        self.add_replies(25)
+
+    def test_thread_list_budget(self):
+        self.assertQueryBudget(self.list_url, 12)
+
+    def test_thread_detail_budget(self):
+        self.assertQueryBudget(self.detail_url, 10)
+
+    def test_reply_page_budget(self):
+        self.assertQueryBudget(reverse('threads:reply_page', kwargs={'pk': self.thread.pk, 'order_by': '-created_at'}), 6)
+
+
+class KeysetCursorTests(ThreadPageTestCase):
+
+    def test_malformed_cursor_is_not_found(self):
+        reply_page_url = reverse('threads:reply_page', kwargs={'pk': self.thread.pk, 'order_by': '-created_at'})
+        for raw in (b'[1,1]', b'[null,null]', b'[null,1]', b'[[1],1]'):
+            cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+            for param in ('after', 'before'):
+                response = self.client.get(f'{self.list_url}?{param}={cursor}')
+                self.assertEqual(response.status_code, 404)
+            self.assertEqual(self.client.get(f'{self.detail_url}?after={cursor}').status_code, 404)
+            self.assertEqual(self.client.get(f'{reply_page_url}?after={cursor}').status_code, 404)
+
+
+class ApproximateTotalTests(ThreadPageTestCase):
+
+    def test_unknown_tag_filter_does_not_poison_category_count(self):
+        response = self.client.get(f'{self.list_url}?f=no-such-tag')
+        self.assertEqual(response.context['approximate_total'], 0)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.context['approximate_total'], 1)
+
+
+class TrigramIndexSyncTests(ThreadPageTestCase):
+
+    def test_sync_picks_up_edits_and_soft_deletes_from_other_workers(self):
+        index = TrigramIndex(sync_interval=3600)
+        spam = Thread.objects.create(title='Cheap watches here', raw_content='spam', author=self.author, category=self.category)
+        for thread in (self.thread, spam):
+            index.add(thread.pk, thread.category_id, thread.title)
+        index._mark = timezone.now()
+        self.thread.title = 'Renamed discussion'
+        self.thread.save()
+        Thread.objects.filter(pk=spam.pk).soft_delete()
+        index.sync()
+        self.assertEqual([pk for pk, _, _ in index.search(self.category.pk, 'renamed', 5)], [self.thread.pk])
+        self.assertEqual(index.search(self.category.pk, 'watches', 5), [])
+
+
+class OutboxTests(TestCase):
+
+    def test_repeated_messages_are_all_sent(self):
+        queue_mail('bob@example.com', 'Hello', 'Same body')
+        self.assertEqual(send_queued_mail(), (1, 0))
+        queue_mail('bob@example.com', 'Hello', 'Same body')
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_idempotency_key_dedupes(self):
+        queue_mail('bob@example.com', 'Hello', 'First', idempotency_key='welcome')
+        queue_mail('bob@example.com', 'Hello', 'Second', idempotency_key='welcome')
+        queue_mail('alice@example.com', 'Hello', 'First', idempotency_key='welcome')
+        self.assertEqual(OutboundMail.objects.count(), 2)
+
+
+class DigestTests(ThreadPageTestCase):
+
+    def notify(self) -> None:
+        notification = Notification.objects.create(recipient=self.user, actor=self.author, kind=Notification.KindChoices.REPLY, thread=self.thread)
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+    def test_identical_digests_on_later_passes_are_queued(self):
+        self.user.digest_frequency = User.DigestChoices.FREQUENT
+        self.user.save()
+        for _ in range(2):
+            self.notify()
+            call_command('send_digests', '--once', stdout=StringIO())
+        digests = OutboundMail.objects.filter(recipient=self.user.email)
+        self.assertEqual(digests.count(), 2)
+        self.assertEqual(len({digest.body for digest in digests}), 1)
+
+
+@override_settings(THREADS_TASK_EAGER=True)
+class EventDeliveryTests(ThreadPageTestCase):
+
+    def delivered(self, calls, event_type) -> dict:
+        counts = {}
+        for handler, batch in calls:
+            matching = [event for event in batch if isinstance(event, event_type)]
+            if matching:
+                counts[handler] = counts.get(handler, 0) + len(matching)
+        return counts
+
+    def test_reply_save_dispatches_reply_created_once(self):
+        with events.capture() as calls, self.captureOnCommitCallbacks(execute=True):
+            Reply.objects.create(thread=self.thread, raw_content='Thanks', author=self.user)
+        delivered = self.delivered(calls, events.ReplyCreated)
+        self.assertTrue(delivered)
+        self.assertEqual(set(delivered.values()), {1})
+
+    def test_rolled_back_savepoint_dispatches_nothing(self):
+        with events.capture() as calls, self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Reply.objects.create(thread=self.thread, raw_content='Never mind', author=self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(calls, [])
+
+    def test_edit_without_mention_change_dispatches_no_mention_added(self):
+        with events.capture() as created, self.captureOnCommitCallbacks(execute=True):
+            reply = Reply.objects.create(thread=self.thread, raw_content='@author have a look', author=self.user)
+        self.assertTrue(self.delivered(created, events.MentionAdded))
+        reply = Reply.objects.get(pk=reply.pk)
+        with events.capture() as calls, self.captureOnCommitCallbacks(execute=True):
+            reply.raw_content = '@author have another look'
+            reply.save()
+        self.assertEqual(self.delivered(calls, events.MentionAdded), {})
+        self.assertTrue(self.delivered(calls, events.ReplyEdited))
+
+    def test_reply_moves_last_activity_after_commit(self):
+        thread_table = Thread._meta.db_table
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                reply = Reply.objects.create(thread=self.thread, raw_content='Late reply', author=self.user)
+            self.assertFalse([query for query in queries if query['sql'].startswith(f'UPDATE "{thread_table}"')])
+        self.assertTrue(callbacks)
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.last_activity_at, reply.created_at)
+
+    def test_suppressed_handlers_receive_nothing(self):
+        muted = events.suppress(handlers.notify_thread_authors, handlers.sync_mentions)
+        with events.capture() as calls, muted, self.captureOnCommitCallbacks(execute=True):
+            Reply.objects.create(thread=self.thread, raw_content='@reader seeded reply', author=self.user)
+        delivered = {handler for handler, _ in calls}
+        self.assertNotIn(handlers.notify_thread_authors, delivered)
+        self.assertNotIn(handlers.sync_mentions, delivered)
+        self.assertIn(handlers.index_replies, delivered)
+        self.assertFalse(Notification.objects.exists())
+
+
+class FragmentInvalidationTests(ThreadPageTestCase):
+
+    def test_cached_cards_follow_tag_and_author_edits(self):
+        tag = Tag.objects.create(name='exams', color='#111111')
+        self.thread.tags.add(tag)
+        self.assertContains(self.client.get(self.list_url), 'exams')
+        tag.name = 'finals'
+        tag.save()
+        self.author.full_name = 'Ada Lovelace'
+        self.author.save()
+        # Fragments stay warm, only the version and live blocks may change what is shown
+        response = self.client.get(self.list_url)
+        self.assertContains(response, 'finals')
+        self.assertNotContains(response, 'exams')
+        self.assertContains(response, 'Ada Lovelace')
+
+    def test_cached_replies_follow_author_edits(self):
+        replier = User.objects.create_user(username='replier', email='replier@example.com', password='password')
+        Reply.objects.create(thread=self.thread, raw_content='Hello there', author=replier)
+        self.assertContains(self.client.get(self.detail_url), '@replier')
+        replier.full_name = 'Grace Hopper'
+        replier.save()
+        self.assertContains(self.client.get(self.detail_url), 'Grace Hopper')
+
+    def test_reply_blocks_keep_viewer_markup_live(self):
+        Reply.objects.create(thread=self.thread, raw_content='Hello there', author=self.author)
+        self.assertNotContains(self.client.get(self.detail_url), 'Edit Reply')
+        # Same cached block, rendered for its author this time
+        self.client.force_login(self.author)
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, 'Edit Reply')
+        self.assertNotContains(response, 'Report Reply')
+
+
+class PostVersionTests(ThreadPageTestCase):
+
+    def test_concurrent_edits_both_move_the_version(self):
+        first, second = Thread.objects.get(pk=self.thread.pk), Thread.objects.get(pk=self.thread.pk)
+        first.raw_content = 'Edited once'
+        first.save()
+        second.raw_content = 'Edited twice'
+        second.save()
+        self.assertEqual((first.version, second.version), (2, 3))
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).version, 3)
+
+
+class SharedCacheTests(ThreadPageTestCase):
+
+    def test_conditional_get_needs_a_shared_cache(self):
+        etag = self.client.get(self.list_url).headers.get('ETag')
+        self.assertIsNone(etag)
+        with tempfile.TemporaryDirectory() as location, self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+            etag = self.client.get(self.list_url).headers['ETag']
+            self.assertEqual(self.client.get(self.list_url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_anonymous_category_list_is_not_cached_per_process(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('threads:category_list')).status_code, 200)
+        self.assertIsNone(cache.get(Category.LIST_KEY))
+
+
+class SearchVectorTests(ThreadPageTestCase):
+
+    def test_pages_do_not_read_the_search_vector(self):
+        self.add_replies(2)
+        for url in (self.list_url, self.detail_url):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertFalse([query['sql'] for query in queries if 'search_vector' in query['sql']])
+
+    def test_edit_writes_only_the_edited_columns(self):
+        self.client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('threads:thread_edit', kwargs={'pk': self.thread.pk}), {'title': 'Edited', 'raw_content': 'Changed'})
+        self.assertEqual(response.status_code, 302)
+        updates = [query['sql'] for query in queries if query['sql'].startswith(f'UPDATE "{Thread._meta.db_table}"')]
+        self.assertTrue(updates)
+        self.assertFalse([sql for sql in updates if 'search_vector' in sql])
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).title, 'Edited')
+
+
+class ReconcileCountersTests(ThreadPageTestCase):
+
+    def test_drifted_counts_are_fixed_around_pending_deltas(self):
+        self.add_replies(2)
+        Thread.objects.filter(pk=self.thread.pk).update(reply_count=10, upvote_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        counters.flush()
+        thread = Thread.objects.get(pk=self.thread.pk)
+        self.assertEqual((thread.reply_count, thread.upvote_count), (2, 0))
+
+
+class UpvoteTests(ThreadPageTestCase):
+
+    def test_toggle_adds_and_removes_one_vote(self):
+        self.assertTrue(self.thread.update_upvotes(self.user))
+        self.assertEqual(ThreadVote.objects.filter(thread=self.thread, user=self.user).count(), 1)
+        self.assertEqual(Thread.objects.with_exact_counts().get(pk=self.thread.pk).exact_upvote_count, 1)
+        self.assertFalse(self.thread.update_upvotes(self.user))
+        self.assertFalse(ThreadVote.objects.filter(thread=self.thread, user=self.user).exists())
+        self.assertEqual(Thread.objects.with_exact_counts().get(pk=self.thread.pk).exact_upvote_count, 0)
+
+    def test_one_vote_per_user(self):
+        reply = Reply.objects.create(thread=self.thread, raw_content='Reply', author=self.author)
+        for _ in range(3):
+            reply.update_upvotes(self.user)
+        reply.update_upvotes(self.author)
+        self.assertEqual(ReplyVote.objects.filter(reply=reply, user=self.user).count(), 1)
+        self.assertEqual(Reply.objects.with_exact_counts().get(pk=reply.pk).exact_upvote_count, 2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReplyVote.objects.create(reply=reply, user=self.user)
+
+    def test_exact_counts_match_vote_rows(self):
+        self.add_threads(3)
+        self.add_replies(3)
+        for voter in (self.author, self.user):
+            self.thread.update_upvotes(voter)
+        self.thread.update_upvotes(self.author)
+        for thread in Thread.objects.with_exact_counts():
+            self.assertEqual(thread.exact_upvote_count, ThreadVote.objects.filter(thread=thread).count())
+        for reply in Reply.objects.with_exact_counts():
+            self.assertEqual(reply.exact_upvote_count, ReplyVote.objects.filter(reply=reply).count())
+
+
+class CounterFlushTests(ThreadPageTestCase):
+
+    def test_flush_folds_and_deletes_deltas(self):
+        self.add_replies(3)
+        self.thread.update_upvotes(self.author)
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).reply_count, 0)
+        applied = CounterDelta.objects.count()
+        self.assertEqual(counters.flush(), applied)
+        self.assertFalse(CounterDelta.objects.exists())
+        thread = Thread.objects.get(pk=self.thread.pk)
+        self.assertEqual((thread.reply_count, thread.upvote_count), (3, 1))
+        self.assertEqual(set(Reply.objects.values_list('upvote_count', flat=True)), {1})
+        self.assertEqual(counters.flush(), 0)
+
+    def test_failed_flush_keeps_deltas(self):
+        self.add_replies(2)
+        pending = CounterDelta.objects.count()
+        apply = counters._apply
+
+        def apply_then_fail(model, objects):
+            apply(model, objects)
+            raise DatabaseError
+
+        # Fails after the UPDATE ran, the whole batch has to roll back with it
+        with mock.patch('threads.counters._apply', apply_then_fail), self.assertRaises(DatabaseError):
+            counters.flush()
+        self.assertEqual(CounterDelta.objects.count(), pending)
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).reply_count, 0)
+        counters.flush()
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).reply_count, 2)
+
+
+class BulkSoftDeleteTests(ThreadPageTestCase):
+
+    def test_reply_counts_follow_bulk_deletes_across_threads(self):
+        other = Thread.objects.create(title='Second thread', raw_content='Hello', author=self.user, category=self.category)
+        for thread, author, count in ((self.thread, self.author, 3), (self.thread, self.user, 2), (other, self.author, 4), (other, self.user, 1)):
+            for i in range(count):
+                Reply.objects.create(thread=thread, raw_content=f'Reply {i}', author=author)
+        self.assertEqual(Reply.objects.filter(author=self.author).soft_delete(), 7)
+        # Already deleted replies are skipped, so the counts never go below the live rows
+        self.assertEqual(Reply.objects.filter(thread=self.thread).soft_delete(), 2)
+        counters.flush()
+        for thread, live in ((self.thread, 0), (other, 1)):
+            self.assertEqual(Thread.objects.get(pk=thread.pk).reply_count, live)
+            self.assertEqual(Reply.objects.filter(thread=thread, is_deleted=False).count(), live)
+
+    def test_admin_action_deletes_everything_by_the_authors(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        other = Thread.objects.create(title='Second thread', raw_content='Hello', author=self.user, category=self.category)
+        for thread in (self.thread, other, other):
+            Reply.objects.create(thread=thread, raw_content='Reply', author=self.author)
+        Reply.objects.create(thread=other, raw_content='Reply', author=self.user)
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:threads_thread_changelist'), {'action': 'soft_delete_by_authors', '_selected_action': [self.thread.pk]})
+        self.assertEqual(response.status_code, 302)
+        counters.flush()
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).reply_count, 0)
+        self.assertEqual(Thread.objects.get(pk=other.pk).reply_count, 1)
+        self.assertTrue(Thread.objects.get(pk=self.thread.pk).is_deleted)
+
+
+class RenderedContentTests(ThreadPageTestCase):
+
+    def test_stale_renderer_hash_is_rendered_again(self):
+        Thread.objects.filter(pk=self.thread.pk).update(raw_content='**bold**', rendered_content='<p>old</p>', content_hash=renderer.content_hash('**bold**'), renderer_hash='stale')
+        thread = Thread.objects.get(pk=self.thread.pk)
+        self.assertFalse(thread.is_rendered)
+        self.assertIn('<strong>bold</strong>', thread.content)
+        call_command('rerender_posts', stdout=StringIO())
+        thread = Thread.objects.get(pk=self.thread.pk)
+        self.assertTrue(thread.is_rendered)
+        self.assertEqual(thread.renderer_hash, renderer.RENDERER_HASH)
+        self.assertIn('<strong>bold</strong>', thread.rendered_content)
+
+
+class RenderCacheTests(TestCase):
+
+    def test_stays_under_its_byte_limit_and_evicts_oldest_first(self):
+        value = 'x' * 100
+        cost = sys.getsizeof('key0') + sys.getsizeof(value)
+        lru = RenderCache(max_bytes=cost * 3)
+        for i in range(3):
+            lru.set(f'key{i}', value)
+        self.assertIsNotNone(lru.get('key0'))
+        lru.set('key3', value)
+        self.assertLessEqual(lru.size, lru.max_bytes)
+        self.assertIsNone(lru.get('key1'))
+        self.assertEqual([key for key in ('key0', 'key2', 'key3') if lru.get(key) is not None], ['key0', 'key2', 'key3'])
+        self.assertEqual(lru.stats()['evictions'], 1)
+        lru.set('huge', 'x' * cost * 4)
+        self.assertIsNone(lru.get('huge'))
+        self.assertLessEqual(lru.size, lru.max_bytes)
@@ -2,7 +2,9 @@ from django.urls import path
 from threads.views import (
     CategoryListView,
     ThreadListView,
+    TypeaheadView,
     ThreadDetailView,
+    ReplyPageView,
     ThreadCreateView,
     ReportCreateView,
     ReportListView,
@@ -12,14 +14,17 @@ from threads.views import (
     ThreadEditView,
     ReplyEditView,
     ReportUpdateStatusView,
-    TagCreateView
+    TagCreateView,
+    MetricsView
 )
 
 app_name = 'threads'
 urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category_list'),
+    path('categories/<slug:slug>/typeahead/', TypeaheadView.as_view(), name='typeahead'),
     path('categories/<slug:slug>/<str:order_by>/', ThreadListView.as_view(), name='thread_list'),
     path('view/<int:pk>/<str:order_by>/', ThreadDetailView.as_view(), name='thread_detail'),
+    path('view/<int:pk>/<str:order_by>/replies/', ReplyPageView.as_view(), name='reply_page'),
     path('create/<int:pk>/', ThreadCreateView.as_view(), name='thread_create'),
     path('create/tags/', TagCreateView.as_view(), name='tag_create'),
     path('edit/<int:pk>/thread/', ThreadEditView.as_view(), name='thread_edit'),
@@ -29,5 +34,6 @@ urlpatterns = [
     path('reports/update/<int:pk>/', ReportUpdateStatusView.as_view(), name='report_update'),
     path('upvote/<int:pk>/<str:type>/', UpvoteView.as_view(), name='upvote'),
     path('delete/<int:pk>/<str:type>/', DeleteView.as_view(), name='delete'),
-    path('lock/<int:pk>/', LockView.as_view(), name='lock')
+    path('lock/<int:pk>/', LockView.as_view(), name='lock'),
+    path('metrics/', MetricsView.as_view(), name='metrics')
 ]
@@ -1,33 +1,71 @@
 import random
-import threading
-from django.core.mail import send_mail, send_mass_mail
+import hashlib
+from datetime import timedelta
+from django.apps import apps
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
-def queue_mail(to, subject: str, body: str):
+def _outbox_row(to, subject: str, body: str, from_email: str | None = None, idempotency_key: str | None = None):
+    OutboundMail = apps.get_model('threads', 'OutboundMail')
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    # Only a caller's idempotency key dedupes, identical messages sent on purpose are all delivered
+    dedupe_key = hashlib.sha256(f'{idempotency_key}\0{to}'.encode()).hexdigest() if idempotency_key else None
+    return OutboundMail(dedupe_key=dedupe_key, recipient=to, from_email=from_email, subject=subject, body=body)
 
-    def send(to, subject, body):
-        send_mail(
-            subject=subject,
-            message=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[to],
-            fail_silently=True
-        )
-
-    threading.Thread(
-        target=send,
-        args=(to, subject, body)
-    ).start()
+def queue_mail(to, subject: str, body: str, idempotency_key: str | None = None):
+    queue_mass_mail(((subject, body, settings.DEFAULT_FROM_EMAIL, [to], idempotency_key), ))
 
 def queue_mass_mail(messages):
+    # Rows are written in the caller's transaction and sent by `manage.py mail_worker`
+    # Messages are (subject, body, from_email, recipients) with an optional fifth idempotency key
+    rows = [
+        _outbox_row(to, subject, body, from_email, *key)
+        for subject, body, from_email, recipients, *key in messages
+        for to in recipients
+        if to
+    ]
+    if rows:
+        apps.get_model('threads', 'OutboundMail').objects.bulk_create(rows, ignore_conflicts=True)
 
-    def send(messages):
-        send_mass_mail(messages, fail_silently=True)
-
-    threading.Thread(
-        target=send,
-        args=(messages, )
-    ).start()
+def send_queued_mail(batch_size: int = 100, max_attempts: int = 8, retry_delay: int = 60, connection=None, lease: int = 300) -> tuple[int, int]:
+    """Sends one batch of due outbox rows over a single SMTP connection, returns (sent, failed)"""
+    OutboundMail = apps.get_model('threads', 'OutboundMail')
+    Status = OutboundMail.StatusChoices
+    sent = failed = 0
+    # Rows are leased in a short transaction, SMTP runs outside it and a crashed worker's rows come back after `lease`
+    with transaction.atomic():
+        batch = list(
+            OutboundMail.objects.select_for_update(skip_locked=True)
+            .filter(status=Status.PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+        leased_until = timezone.now() + timedelta(seconds=lease)
+        OutboundMail.objects.filter(pk__in=[mail.pk for mail in batch]).update(next_attempt_at=leased_until)
+    connection = connection or get_connection()
+    with connection:
+        for mail in batch:
+            message = EmailMessage(mail.subject, mail.body, mail.from_email, [mail.recipient], connection=connection)
+            mail.attempts += 1
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                mail.last_error = f'{e.__class__.__name__}: {e}'
+                if mail.attempts >= max_attempts:
+                    mail.status = Status.FAILED
+                else:
+                    mail.next_attempt_at = timezone.now() + timedelta(seconds=min(retry_delay * 2 ** (mail.attempts - 1), 6 * 3600))
+                failed += 1
+            else:
+                mail.status = Status.SENT
+                mail.sent_at = timezone.now()
+                mail.last_error = ''
+                sent += 1
+    OutboundMail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
 
 def generate_random_color():
     return f'#{random.randint(0, 0xFFFFFF):06x}'
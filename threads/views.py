@@ -1,54 +1,133 @@
 from typing import Any
 from django.conf import settings
-from django.db.models import Count
+from django.core.cache import cache
+from django.db.models import Prefetch
 from django.db.models.base import Model as Model
 from django.db.models.query import QuerySet
 from django.forms import BaseModelForm
-from django.http import HttpRequest, HttpResponse, Http404
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, Http404, JsonResponse
 from django.utils.functional import cached_property
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
 from django.views import generic
 from django.views.generic.edit import FormMixin
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from threads.models import Category, Thread, Reply, Report, Tag
+from threads.models import Category, CounterDelta, Thread, Reply, Report, Tag
+from courses.models import Course, Resource
 from threads.forms import ReplyCreateForm, ReportCreateForm, ThreadCreateForm, TagCreateForm
 from threads.utils import generate_random_color
+from threads import caching, stamps
+from threads.renderer import render_many, render_cache
+from threads.mixins import ConditionalGetMixin
+from threads.pagination import KeysetPaginator, InvalidCursor
+from threads.search import trigram_index
+from threads.tasks import executor
+from threads.templatetags.fragments import fragment_stats
 
 # Create your views here.
 
+THREAD_PREFETCHES = (
+    Prefetch('tags', queryset=Tag.objects.only('id', 'name', 'color')),
+    Prefetch('tagged_courses', queryset=Course.objects.only('id', 'code')),
+    Prefetch('tagged_documents', queryset=Resource.objects.only('id', 'title'))
+)
+THREAD_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    '-upvote_count': ('-upvote_count', '-id'),
+    '-last_activity_at': ('-last_activity_at', '-id'),
+    '-hot_score': ('-hot_score', '-id')
+}
+# Detail pages share the list's order_by, recently active threads show their newest replies first, hot ones their top replies
+REPLY_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    '-upvote_count': ('-upvote_count', '-id'),
+    '-last_activity_at': ('-created_at', '-id'),
+    '-hot_score': ('-upvote_count', '-id')
+}
+
+
 class CategoryListView(generic.ListView):
     model = Category
     template_name = 'threads/category_list.html'
     context_object_name = 'categories'
 
-
-class ThreadListView(generic.ListView):
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        # Anonymous visitors share one rendered page, signals drop it when a category is saved or deleted,
+        # which only reaches the other workers through a shared cache
+        if request.user.is_authenticated or not stamps.shared() or list(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+        content = cache.get(Category.LIST_KEY)
+        if content is None:
+            response = super().get(request, *args, **kwargs)
+            response.render()
+            cache.set(Category.LIST_KEY, response.content, settings.THREADS_PAGE_CACHE_TIMEOUT)
+            return response
+        return HttpResponse(content)
+
+
+class ThreadListView(ConditionalGetMixin, generic.ListView):
     model = Thread
     template_name = 'threads/thread_list.html'
     context_object_name = 'threads'
     paginate_by = 10
+    count_timeout = 300
+
+    def get_stamp(self) -> float:
+        return stamps.get(categories=[self.category.pk])
 
     def get_queryset(self) -> QuerySet[Any]:
         if self.query and self.query != '':
             qs = Thread.fuzzy_search(self.query)
+            ordering = ('-score', self.order_by)
         else:
             qs = Thread.objects.all()
+            ordering = (self.order_by, )
         if self.filters:
-            qs = qs.filter(category=self.category, is_deleted=False, tags__in=self.selected_tags).distinct().order_by(self.order_by)
+            qs = qs.filter(category=self.category, is_deleted=False, tags__in=self.selected_tags).distinct().order_by(*ordering)
         else:
-            qs = qs.filter(category=self.category, is_deleted=False).order_by(self.order_by)
-        return qs.prefetch_related('tags').select_related('author', 'category')
+            qs = qs.filter(category=self.category, is_deleted=False).order_by(*ordering)
+        return qs.prefetch_related(*THREAD_PREFETCHES).select_related('author', 'category').annotate(user_has_upvoted=Thread.upvoted_by(self.request.user))
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, THREAD_ORDERINGS[self.order_by], page_size)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except InvalidCursor:
+            raise Http404('Invalid content parameters!')
+        return (paginator, page, page.object_list, page.has_other_pages())
     
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
         context['query'] = self.query
         context['selected'] = self.selected_tags
-        context['tags'] = Tag.objects.annotate(threads=Count('tagged')).filter(threads__gte=1).order_by('-threads')
+        context['tags'] = Tag.cloud(self.category)
+        context['keyset'] = self.keyset
+        if self.keyset and self.count_timeout:
+            context['approximate_total'] = self.approximate_total
         return context
 
+    @property
+    def approximate_total(self) -> int:
+        if self.filters and not self.selected_tags:
+            # Unknown tags match nothing, and must not share the unfiltered key below
+            return 0
+        tag_ids = ','.join(str(tag.pk) for tag in sorted(self.selected_tags, key=lambda tag: tag.pk))
+        key = f'threads:thread_count:{self.category.pk}:{tag_ids}'
+        qs = Thread.objects.filter(category=self.category, is_deleted=False)
+        if self.filters:
+            qs = qs.filter(tags__in=self.selected_tags).distinct()
+        return caching.get_or_compute(key, qs.count, self.count_timeout)
+
+    @cached_property
+    def keyset(self) -> bool:
+        return not self.query
+
     @cached_property
     def category(self):
         return get_object_or_404(Category, slug=self.kwargs.get('slug'))
@@ -56,7 +135,7 @@ class ThreadListView(generic.ListView):
     @cached_property
     def order_by(self):
         order_by = self.kwargs.get('order_by')
-        if order_by not in ('-created_at', '-upvote_count'):
+        if order_by not in THREAD_ORDERINGS:
             raise Http404('Invalid content parameters!')
         return order_by
     
@@ -78,6 +157,46 @@ class ThreadListView(generic.ListView):
         return self.request.GET.get('q')
 
 
+class TypeaheadView(generic.View):
+    max_results = 20
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if len(self.query) < 2:
+            return JsonResponse({'results': []})
+        if settings.THREADS_TYPEAHEAD_INDEX:
+            if trigram_index.ready:
+                matches = [(pk, title) for pk, title, _ in trigram_index.search(self.category.pk, self.query, self.limit)]
+            else:
+                trigram_index.warm()
+                matches = self.search_database()
+        else:
+            matches = self.search_database()
+        results = [
+            {'id': pk, 'title': title, 'url': reverse('threads:thread_detail', kwargs={'pk': pk, 'order_by': '-created_at'})}
+            for pk, title in matches
+        ]
+        return JsonResponse({'results': results})
+
+    def search_database(self) -> list[tuple[int, str]]:
+        return list(Thread.fuzzy_search(self.query).filter(category=self.category, is_deleted=False).values_list('pk', 'title')[:self.limit])
+
+    @cached_property
+    def category(self):
+        return get_object_or_404(Category, slug=self.kwargs.get('slug'))
+
+    @cached_property
+    def query(self):
+        return self.request.GET.get('q', '').strip()
+
+    @cached_property
+    def limit(self):
+        try:
+            limit = int(self.request.GET.get('k', 8))
+        except ValueError:
+            raise Http404('Invalid content parameters!')
+        return max(1, min(limit, self.max_results))
+
+
 class ThreadCreateView(LoginRequiredMixin, generic.CreateView):
     model = Thread
     form_class = ThreadCreateForm
@@ -128,6 +247,13 @@ class ThreadEditView(LoginRequiredMixin, UserPassesTestMixin, generic.UpdateView
 
     def test_func(self) -> bool | None:
         return self.get_object().author == self.request.user # type: ignore
+
+    def form_valid(self, form: BaseModelForm) -> HttpResponse:
+        # Only the edited columns, the search vector is rebuilt by the ThreadEdited handler
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=['title', 'raw_content', 'updated_at'])
+        form.save_m2m()
+        return HttpResponseRedirect(self.get_success_url())
     
 class ReplyEditView(LoginRequiredMixin, UserPassesTestMixin, generic.UpdateView):
     model = Reply
@@ -145,7 +271,34 @@ class ReplyEditView(LoginRequiredMixin, UserPassesTestMixin, generic.UpdateView)
         return self.get_object().author == self.request.user # type: ignore
 
 
-class ThreadDetailView(LoginRequiredMixin, FormMixin, generic.DetailView):
+class ReplyPageMixin:
+    replies_per_page = 20
+
+    def get_reply_page(self, thread):
+        replies = thread.replies.filter(is_deleted=False).select_related('author').with_exact_counts().annotate(user_has_upvoted=Reply.upvoted_by(self.request.user)) # type: ignore
+        paginator = KeysetPaginator(replies, REPLY_ORDERINGS[self.order_by], self.replies_per_page) # type: ignore
+        try:
+            page = paginator.page(after=self.request.GET.get('after')) # type: ignore
+        except InvalidCursor:
+            raise Http404('Invalid content parameters!')
+        render_many(page)
+        return page
+
+    def get_next_page_url(self, thread, page) -> str | None:
+        if not page.has_next:
+            return None
+        url = reverse('threads:reply_page', kwargs={'pk': thread.pk, 'order_by': self.order_by}) # type: ignore
+        return f'{url}?after={page.next_cursor}'
+
+    @cached_property
+    def order_by(self):
+        order_by = self.kwargs.get('order_by') # type: ignore
+        if order_by not in REPLY_ORDERINGS:
+            raise Http404('Invalid ordering parameter!')
+        return order_by
+
+
+class ThreadDetailView(LoginRequiredMixin, ConditionalGetMixin, ReplyPageMixin, FormMixin, generic.DetailView):
     model = Thread
     template_name = 'threads/thread_detail.html'
     context_object_name = 'thread'
@@ -154,6 +307,9 @@ class ThreadDetailView(LoginRequiredMixin, FormMixin, generic.DetailView):
     def get_success_url(self) -> str:
         return self.request.path
 
+    def get_stamp(self) -> float:
+        return stamps.get(threads=[self.kwargs['pk']])
+
     def post(self, request, *args, **kwargs): 
         self.object = self.get_object()
         form = self.get_form()
@@ -179,22 +335,36 @@ class ThreadDetailView(LoginRequiredMixin, FormMixin, generic.DetailView):
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context['replies'] = self.get_object().replies.filter(is_deleted=False).select_related('author').order_by(self.order_by) # type: ignore
+        page = self.get_reply_page(self.object)
+        render_many([self.object])
+        context['replies'] = page.object_list
+        context['replies_page'] = page
+        context['next_replies_url'] = self.get_next_page_url(self.object, page)
         return context
     
     def get_queryset(self) -> QuerySet[Any]:
-        return super().get_queryset().select_related('author', 'category').prefetch_related('tags').filter(is_deleted=False)
+        return super().get_queryset().select_related('author', 'category').prefetch_related(*THREAD_PREFETCHES).filter(is_deleted=False).with_exact_counts().annotate(user_has_upvoted=Thread.upvoted_by(self.request.user))
     
     @cached_property
     def author(self):
         return self.request.user
-    
+
+
+class ReplyPageView(LoginRequiredMixin, ReplyPageMixin, generic.View):
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        page = self.get_reply_page(self.thread)
+        context = {
+            'thread': self.thread,
+            'replies': page.object_list,
+            'return_url': reverse('threads:thread_detail', kwargs={'pk': self.thread.pk, 'order_by': self.order_by})
+        }
+        html = render_to_string('threads/reply_list.html', context, request=request)
+        return JsonResponse({'html': html, 'next': self.get_next_page_url(self.thread, page)})
+
     @cached_property
-    def order_by(self):
-        order_by = self.kwargs.get('order_by')
-        if order_by not in ('-created_at', '-upvote_count'):
-            raise Http404('Invalid ordering parameter!')
-        return order_by
+    def thread(self):
+        return get_object_or_404(Thread, pk=self.kwargs.get('pk'), is_deleted=False)
 
 
 class ReportCreateView(LoginRequiredMixin, generic.CreateView):
@@ -287,7 +457,12 @@ class ReportListView(LoginRequiredMixin, UserPassesTestMixin, generic.ListView):
     paginate_by = 10
 
     def get_queryset(self) -> QuerySet[Any]:
-        return Report.objects.select_related('reporter', 'reply', 'thread').order_by('status', '-created_at')
+        return Report.objects.select_related('reporter', 'reply', 'thread').defer('thread__search_vector').order_by('status', '-created_at')
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        render_many(post for report in context['reports'] for post in (report.thread, report.reply))
+        return context
     
     def test_func(self) -> bool | None:
         return self.request.user.is_staff
@@ -380,7 +555,7 @@ class DeleteView(LoginRequiredMixin, UserPassesTestMixin, generic.RedirectView):
         return reverse_lazy('threads:thread_list', kwargs={'slug': self.slug, 'order_by': '-created_at'})
     
     def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        self.object.soft_delete()
+        self.object.__class__.objects.filter(pk=self.object.pk).soft_delete()
         return super().post(request, *args, **kwargs)
     
     def test_func(self) -> bool | None:
@@ -424,7 +599,11 @@ class LockView(LoginRequiredMixin, UserPassesTestMixin, generic.RedirectView):
         return reverse_lazy('threads:thread_list', kwargs={'slug': self.slug, 'order_by': '-created_at'})
 
     def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        self.object.update_lock()
+        threads = Thread.objects.filter(pk=self.object.pk)
+        if self.object.is_locked:
+            threads.unlock()
+        else:
+            threads.lock()
         return super().post(request, *args, **kwargs)
     
     def test_func(self) -> bool | None:
@@ -438,3 +617,22 @@ class LockView(LoginRequiredMixin, UserPassesTestMixin, generic.RedirectView):
     @cached_property
     def slug(self):
         return self.object.category.slug
+
+
+
+class MetricsView(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        return JsonResponse(self.get_metrics())
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {
+            'render_cache': render_cache.stats(),
+            'trigram_index': trigram_index.stats(),
+            'tasks': executor.stats(),
+            'counters': {'pending_deltas': CounterDelta.objects.count()},
+            'fragments': fragment_stats.stats()
+        }
+
+    def test_func(self) -> bool | None:
+        return self.request.user.is_staff
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from threads.models import Thread, Reply
 from users.models import User
 
 # Register your models here.
@@ -8,7 +9,15 @@ from users.models import User
 class CustomUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
         ('Metadata', {'fields': ('full_name', 'avatar')}),
+        ('Notifications', {'fields': ('digest_frequency', )}),
     ) # type: ignore
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('Metadata', {'fields': ('full_name', 'avatar')}),
     )
+    actions = ['soft_delete_posts']
+
+    @admin.action(description='Soft delete all Threads and Replies by selected users')
+    def soft_delete_posts(self, request, queryset) -> None:
+        threads = Thread.objects.filter(author__in=queryset).soft_delete()
+        replies = Reply.objects.filter(author__in=queryset).soft_delete()
+        self.message_user(request, f'Soft deleted {threads} threads and {replies} replies')
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='digest_frequency',
+            field=models.CharField(choices=[('FREQUENT', 'Every few minutes'), ('DAILY', 'Daily'), ('NEVER', 'Never')], default='FREQUENT', max_length=8, verbose_name='digest frequency'),
+        ),
+    ]
@@ -4,5 +4,12 @@ from django.contrib.auth.models import AbstractUser
 # Create your models here.
 
 class User(AbstractUser):
+
+    class DigestChoices(models.TextChoices):
+        FREQUENT = 'FREQUENT', 'Every few minutes'
+        DAILY = 'DAILY', 'Daily'
+        NEVER = 'NEVER', 'Never'
+
     full_name = models.CharField(verbose_name='full_name', max_length=255, blank=True)
     avatar = models.URLField(verbose_name='avatar', blank=True, null=True)
+    digest_frequency = models.CharField(verbose_name='digest frequency', choices=DigestChoices.choices, max_length=8, default=DigestChoices.FREQUENT)